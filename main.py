@@ -12,8 +12,15 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from src.batch_processor import BatchProcessor
+from src.payload_codec import PAYLOAD_FORMATS
+from src.planner import RunPlanner, print_plan
+from src.profiler import StageProfiler
+from src.query_daemon import QueryDaemon
+from src.template_service import TemplateService
 
 
+DEFAULT_OUTPUT = "/Users/int1964/TEMPLATE_GENRATOR/data/templates_output.jsonl"
+
 def load_system_prompt(path: str) -> str:
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
@@ -28,8 +35,12 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--output",
-        default="/Users/int1964/TEMPLATE_GENRATOR/data/templates_output.jsonl",
-        help="Path to output JSONL file",
+        default=None,
+        help=(
+            "Path to output JSONL file (default: templates_output.jsonl; "
+            "templates_output_daemon.jsonl / templates_output_service.jsonl "
+            "for --tail/--watch-dir and --serve)"
+        ),
     )
     parser.add_argument(
         "--registry",
@@ -46,12 +57,102 @@ def build_parser() -> argparse.ArgumentParser:
         default="/Users/int1964/TEMPLATE_GENRATOR/data/only_template_output.txt",
         help="Path to template-only output file for training",
     )
+    parser.add_argument(
+        "--template-store",
+        default=None,
+        help="Directory of the deduplicated template store (replaces --template-only output when set)",
+    )
     parser.add_argument("--batch-size", type=int, default=20, help="Queries per LLM call")
     parser.add_argument("--concurrency", type=int, default=150, help="Parallel LLM calls")
     parser.add_argument("--max-tokens", type=int, default=1536, help="Max tokens per LLM response")
     parser.add_argument("--reset", action="store_true", help="Ignore already processed queries and start fresh")
     parser.add_argument("--fast", action="store_true", help="Fast mode: batch=20, concurrency=150, max_tokens=1536")
     parser.add_argument("--ultra-fast", action="store_true", help="Ultra-fast mode: batch=30, concurrency=200, max_tokens=1024")
+    parser.add_argument(
+        "--registry-cap",
+        type=int,
+        default=None,
+        help="Max active values per entity label; colder values are archived out of the prompt",
+    )
+    parser.add_argument(
+        "--registry-archive-cap",
+        type=int,
+        default=None,
+        help="Max archived values per entity label; colder ones are deleted for good (default: keep all)",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=None,
+        help="Send a duplicate LLM call once latency exceeds this percentile of recent calls (e.g. 95)",
+    )
+    parser.add_argument("--hedge-budget", type=float, default=0.05, help="Max hedged calls as a fraction of all calls")
+    parser.add_argument("--hedge-deployment", default=None, help="Alternate Azure deployment for hedged calls")
+    parser.add_argument(
+        "--payload-format",
+        choices=PAYLOAD_FORMATS,
+        default="json",
+        help="How entity labels/values are sent: verbose json, or compact (deduped, delimiter-joined, label codes)",
+    )
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 to the Azure endpoint (needs h2)")
+    parser.add_argument("--connect-timeout", type=float, default=10.0, help="HTTP connect timeout in seconds")
+    parser.add_argument("--read-timeout", type=float, default=120.0, help="HTTP read timeout in seconds")
+    parser.add_argument(
+        "--keepalive-expiry",
+        type=float,
+        default=60.0,
+        help="Seconds an idle pooled connection is kept open",
+    )
+    parser.add_argument(
+        "--warmup-connections",
+        type=int,
+        default=0,
+        help="Open this many connections before the first batch (0 = off)",
+    )
+    parser.add_argument("--ignore-model", default=None, help="Path to a trained ignore pre-classifier model")
+    parser.add_argument(
+        "--ignore-precision",
+        type=float,
+        default=0.98,
+        help="Minimum holdout precision for routing queries straight to ignore",
+    )
+    parser.add_argument(
+        "--ignore-audit-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of pre-classified ignores still sent to the LLM for auditing",
+    )
+    parser.add_argument("--tail", default=None, help="Daemon mode: tail this JSONL file for new queries")
+    parser.add_argument("--watch-dir", default=None, help="Daemon mode: process query files dropped into this spool directory")
+    parser.add_argument("--max-wait", type=float, default=2.0, help="Daemon mode: max seconds to wait while filling a micro-batch")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Daemon mode: seconds between input polls")
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Daemon mode: checkpoint file (default: <output>.checkpoint.json)",
+    )
+    parser.add_argument("--serve", action="store_true", help="Run a local HTTP service that coalesces requests into LLM batches")
+    parser.add_argument("--host", default="127.0.0.1", help="Service mode: bind address")
+    parser.add_argument("--port", type=int, default=8080, help="Service mode: bind port")
+    parser.add_argument("--serve-max-wait", type=float, default=0.05, help="Service mode: max seconds a request waits for its batch to fill")
+    parser.add_argument("--serve-max-batch", type=int, default=None, help="Service mode: max queries per coalesced batch (default: --batch-size)")
+    parser.add_argument(
+        "--warm-from",
+        default=None,
+        help="Service mode: batch output to seed the cache from (default: the default batch output)",
+    )
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="Service mode: latency SLO reported in /metrics")
+    parser.add_argument("--plan", action="store_true", help="Dry run: estimate calls, tokens, cost drivers and wall time, then exit")
+    parser.add_argument("--tpm", type=int, default=None, help="Plan mode: deployment tokens-per-minute quota")
+    parser.add_argument("--rpm", type=int, default=None, help="Plan mode: deployment requests-per-minute quota")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        default=None,
+        help="Sample the pipeline and write <prefix>.collapsed (flamegraph) and <prefix>_stages.txt at exit",
+    )
+    parser.add_argument("--profile-interval-ms", type=float, default=5.0, help="Profile sampling interval")
     return parser
 
 
@@ -77,6 +178,116 @@ def main() -> None:
 
     system_prompt = load_system_prompt(args.system_prompt)
 
+    # Long-running modes write records without input ids; keeping them out of
+    # the batch output keeps batch resume and the id index about batch input only.
+    if args.output is None:
+        stem, ext = os.path.splitext(DEFAULT_OUTPUT)
+        if args.serve:
+            args.output = f"{stem}_service{ext}"
+        elif args.tail or args.watch_dir:
+            args.output = f"{stem}_daemon{ext}"
+        else:
+            args.output = DEFAULT_OUTPUT
+
+    if args.plan:
+        planner = RunPlanner(
+            input_path=args.input,
+            output_path=args.output,
+            registry_path=args.registry,
+            system_prompt=system_prompt,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            max_tokens=max_tokens,
+            reset=args.reset,
+            registry_cap_per_label=args.registry_cap,
+            ignore_model_path=args.ignore_model,
+            ignore_precision=args.ignore_precision,
+            tpm=args.tpm,
+            rpm=args.rpm,
+            payload_format=args.payload_format,
+        )
+        print_plan(planner.plan())
+        return
+
+    profiler = StageProfiler(
+        enabled=args.profile is not None, interval=args.profile_interval_ms / 1000.0
+    )
+    profiler.start()
+    try:
+        _run(args, system_prompt, batch_size, concurrency, max_tokens, profiler)
+    finally:
+        if args.profile is not None:
+            paths = profiler.write(args.profile)
+            print("\n" + profiler.summary())
+            print(f"🔥 Profile written to {', '.join(paths)}")
+
+
+def _run(
+    args: argparse.Namespace,
+    system_prompt: str,
+    batch_size: int,
+    concurrency: int,
+    max_tokens: int,
+    profiler: StageProfiler,
+) -> None:
+    processor = BatchProcessor(
+        input_path=args.input,
+        output_path=args.output,
+        registry_path=args.registry,
+        system_prompt=system_prompt,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        max_tokens=max_tokens,
+        template_only_path=args.template_only,
+        template_store_dir=args.template_store,
+        reset=args.reset,
+        registry_cap_per_label=args.registry_cap,
+        registry_archive_cap_per_label=args.registry_archive_cap,
+        hedge_percentile=args.hedge_percentile,
+        hedge_budget=args.hedge_budget,
+        hedge_deployment=args.hedge_deployment,
+        ignore_model_path=args.ignore_model,
+        ignore_precision=args.ignore_precision,
+        ignore_audit_rate=args.ignore_audit_rate,
+        profiler=profiler,
+        http2=args.http2,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        keepalive_expiry=args.keepalive_expiry,
+        warmup_connections=args.warmup_connections,
+        payload_format=args.payload_format,
+    )
+
+    if args.serve:
+        service = TemplateService(
+            processor,
+            host=args.host,
+            port=args.port,
+            max_wait=args.serve_max_wait,
+            max_batch=args.serve_max_batch,
+            slo_ms=args.slo_ms,
+        )
+        # Batch results are valid answers too, so warm from both files
+        warm_from = args.warm_from or DEFAULT_OUTPUT
+        warmed = 0
+        for path in dict.fromkeys([warm_from, args.output]):
+            warmed = service.warm_cache(path)
+        print(f"📦 Warmed cache with {warmed} results from {warm_from} and {args.output}")
+        asyncio.run(service.serve())
+        return
+
+    if args.tail or args.watch_dir:
+        daemon = QueryDaemon(
+            processor,
+            checkpoint_path=args.checkpoint or args.output + ".checkpoint.json",
+            tail_path=args.tail,
+            spool_dir=args.watch_dir,
+            max_wait=args.max_wait,
+            poll_interval=args.poll_interval,
+        )
+        asyncio.run(daemon.run())
+        return
+
     # Count total queries to process
     import json
     total_queries = 0
@@ -94,18 +305,6 @@ def main() -> None:
     print(f"📊 Processing {total_queries} queries...")
     start_time = time.time()
 
-    processor = BatchProcessor(
-        input_path=args.input,
-        output_path=args.output,
-        registry_path=args.registry,
-        system_prompt=system_prompt,
-        batch_size=batch_size,
-        concurrency=concurrency,
-        max_tokens=max_tokens,
-        template_only_path=args.template_only,
-        reset=args.reset,
-    )
-
     asyncio.run(processor.run())
 
     # Performance stats
@@ -1,11 +1,20 @@
 import asyncio
 import json
 import os
+import random
 import re
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+from src.ignore_classifier import (
+    IGNORE_SOURCE_CLASSIFIER,
+    IGNORE_SOURCE_FALLBACK,
+    IgnoreClassifier,
+)
 from src.openai_client import AzureOpenAIClient
-from src.result_writer import ResultWriter
+from src.payload_codec import COMPACT_PROMPT_SECTION, codes_for, decode_results, encode_payload
+from src.profiler import StageProfiler
+from src.result_writer import ResultWriter, completed_ordinals, query_hash
+from src.template_store import TemplateStore
 from src.entity_value_registry import EntityValueRegistry, ENTITY_VALUES
 from utils.logger import Logger
 
@@ -17,28 +26,52 @@ def count_lines(path: str) -> int:
         return sum(1 for _ in f)
 
 
+def resume_point(output_path: str) -> Tuple[int, Set[int]]:
+    """Input ordinals a batch run can skip: the first n, plus any listed in the set.
+
+    Uses the output's id index, so records from daemon/service runs or batches
+    that finished out of order are handled; falls back to a line count for
+    output written before records had ids, or when the index is stale.
+    """
+    done = completed_ordinals(output_path)
+    if done is not None:
+        return done
+    return count_lines(output_path), set()
+
+
 def read_jsonl_lines(path: str, skip: int) -> Iterable[str]:
+    for _, line in read_jsonl_records(path, skip):
+        yield line
+
+
+def read_jsonl_records(path: str, skip: int) -> Iterable[Tuple[int, str]]:
+    """Like read_jsonl_lines, but also yields each item's ordinal in the input."""
     with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-    if not content.strip():
-        return
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        if not head:
+            return
+        f.seek(0)
 
-    if content.lstrip().startswith("["):
-        try:
-            data = json.loads(content)
-        except Exception:
+        if head == "[":
+            try:
+                data = json.load(f)
+            except Exception:
+                return
+            if isinstance(data, list):
+                for ordinal in range(skip, len(data)):
+                    yield ordinal, json.dumps(data[ordinal], ensure_ascii=False)
             return
-        if isinstance(data, list):
-            for item in data[skip:]:
-                yield json.dumps(item, ensure_ascii=False)
-        return
-
-    lines = content.splitlines()
-    for line in lines[skip:]:
-        line = line.strip()
-        if not line:
-            continue
-        yield line
+
+        # JSONL is streamed line by line so large inputs are never held in memory
+        for index, line in enumerate(f):
+            if index < skip:
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            yield index, line
 
 
 class BatchProcessor:
@@ -52,23 +85,81 @@ class BatchProcessor:
         concurrency: int = 100,
         max_tokens: int = 2048,
         template_only_path: Optional[str] = None,
+        template_store_dir: Optional[str] = None,
         reset: bool = False,
+        registry_cap_per_label: Optional[int] = None,
+        registry_archive_cap_per_label: Optional[int] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_budget: float = 0.05,
+        hedge_deployment: Optional[str] = None,
+        ignore_model_path: Optional[str] = None,
+        ignore_precision: float = 0.98,
+        ignore_audit_rate: float = 0.0,
+        profiler: Optional[StageProfiler] = None,
+        http2: bool = False,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        keepalive_expiry: float = 60.0,
+        warmup_connections: int = 0,
+        payload_format: str = "json",
     ):
         self.input_path = input_path
         self.output_path = output_path
         self.registry_path = registry_path
+        self.payload_format = payload_format
+        if payload_format == "compact":
+            system_prompt = system_prompt + COMPACT_PROMPT_SECTION
         self.system_prompt = system_prompt
         self.batch_size = batch_size
         self.concurrency = concurrency
         self.max_tokens = max_tokens
         self.template_only_path = template_only_path
+        self.template_store = TemplateStore(template_store_dir) if template_store_dir else None
         self.reset = reset
         self.logger = Logger()
+        self.profiler = profiler or StageProfiler(enabled=False)
         self.writer = ResultWriter(self.output_path)
-        self.registry = EntityValueRegistry(self.registry_path)
-        self.client = AzureOpenAIClient(max_tokens=self.max_tokens)
+        self.registry = EntityValueRegistry(
+            self.registry_path,
+            max_values_per_label=registry_cap_per_label,
+            max_archived_per_label=registry_archive_cap_per_label,
+        )
+        self.client = AzureOpenAIClient(
+            max_tokens=self.max_tokens,
+            hedge_percentile=hedge_percentile,
+            hedge_budget=hedge_budget,
+            hedge_deployment=hedge_deployment,
+            concurrency=self.concurrency,
+            http2=http2,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.warmup_connections = warmup_connections
         self._write_lock = asyncio.Lock()
 
+        self.ignore_classifier: Optional[IgnoreClassifier] = None
+        self.ignore_threshold: Optional[float] = None
+        self.ignore_audit_rate = ignore_audit_rate
+        self._ignore_routed = 0
+        self._ignore_audited = 0
+        self._ignore_audit_agree = 0
+        if ignore_model_path:
+            self.ignore_classifier = IgnoreClassifier.load(ignore_model_path)
+            self.ignore_threshold = self.ignore_classifier.threshold_for_precision(
+                ignore_precision
+            )
+            if self.ignore_threshold is None:
+                self.logger.error(
+                    f"Ignore classifier cannot reach precision {ignore_precision}; disabled"
+                )
+                self.ignore_classifier = None
+            else:
+                self.logger.info(
+                    f"Ignore classifier enabled (precision>={ignore_precision}, "
+                    f"threshold={self.ignore_threshold:.3f})"
+                )
+
     # ------------------------------------------------------------------
     # LLM output helpers
     # ------------------------------------------------------------------
@@ -85,6 +176,20 @@ class BatchProcessor:
                 text = text[:-3]
         return text.strip()
 
+    @classmethod
+    def _parse_results(cls, raw: str, expected: int) -> List[Dict[str, Any]]:
+        """Parse a batch answer, raising ValueError unless it has one result per query."""
+        results = json.loads(cls._sanitize_llm_output(raw))
+        if not isinstance(results, list):
+            raise ValueError("LLM output is not a JSON array")
+        if len(results) != expected:
+            raise ValueError(f"LLM returned {len(results)} results for {expected} queries")
+        # Validate each result has "ignore" field
+        for i, result in enumerate(results):
+            if not isinstance(result, dict) or "ignore" not in result:
+                raise ValueError(f"Result {i} missing 'ignore' field")
+        return results
+
     # ------------------------------------------------------------------
     # Post-process validator
     # ------------------------------------------------------------------
@@ -148,7 +253,6 @@ class BatchProcessor:
             for item in leaked
         )
         correction = {
-            "queries": [query],
             "previous_template": template,
             "errors": (
                 "Your previous template left these entity values as literal text. "
@@ -159,44 +263,61 @@ class BatchProcessor:
                 "replaced by their correct {LABEL} placeholder. "
                 "Do NOT leave any of them as text."
             ),
-            "entity_labels": self.registry.get_entity_labels(),
-            "entity_values_reference": reference_values,
         }
-        return json.dumps(correction, ensure_ascii=False)
+        return encode_payload(
+            [query],
+            self.registry.get_entity_labels(),
+            reference_values,
+            self.payload_format,
+            extra=correction,
+        )
+
+    def _decode_results(
+        self, results: List[Any], reference_values: Dict[str, List[str]]
+    ) -> List[Any]:
+        """Undo label codes in compact mode; a no-op for the json format."""
+        if self.payload_format != "compact":
+            return results
+        codes = codes_for(self.registry.get_entity_labels(), reference_values)
+        return decode_results(results, codes)
 
     # ------------------------------------------------------------------
     # Core processing (batch mode)
     # ------------------------------------------------------------------
 
     async def _process_batch_queries(
-        self, queries: List[str], reference_values: Dict[str, List[str]]
+        self,
+        queries: List[str],
+        reference_values: Dict[str, List[str]],
+        leak_values: Optional[Dict[str, List[str]]] = None,
     ) -> List[Dict[str, Any]]:
         """Process a batch of queries in a single LLM call."""
-        payload = {
-            "queries": queries,
-            "entity_labels": self.registry.get_entity_labels(),
-            "entity_values_reference": reference_values,
-        }
-        payload_str = json.dumps(payload, ensure_ascii=False)
+        if leak_values is None:
+            leak_values = reference_values
+        with self.profiler.stage("encode"):
+            payload_str = encode_payload(
+                queries,
+                self.registry.get_entity_labels(),
+                reference_values,
+                self.payload_format,
+            )
 
         # --- initial LLM call (up to 3 retries) ---
         results: Optional[List[Dict[str, Any]]] = None
         last_error: Optional[str] = None
         for attempt in range(3):
             try:
-                raw = await self.client.chat_completion(self.system_prompt, payload_str)
-                content = self._sanitize_llm_output(raw)
-                results = json.loads(content)
-                if not isinstance(results, list):
-                    raise ValueError("LLM output is not a JSON array")
-                if len(results) != len(queries):
-                    raise ValueError(
-                        f"LLM returned {len(results)} results for {len(queries)} queries"
+                with self.profiler.wait("llm_wait"):
+                    # A hedged duplicate only wins if its answer actually parses
+                    raw = await self.client.chat_completion(
+                        self.system_prompt,
+                        payload_str,
+                        validator=lambda text: self._parse_results(text, len(queries)),
+                    )
+                with self.profiler.stage("parse"):
+                    results = self._decode_results(
+                        self._parse_results(raw, len(queries)), reference_values
                     )
-                # Validate each result has "ignore" field
-                for i, result in enumerate(results):
-                    if not isinstance(result, dict) or "ignore" not in result:
-                        raise ValueError(f"Result {i} missing 'ignore' field")
                 break
             except Exception as exc:
                 last_error = str(exc)
@@ -205,13 +326,18 @@ class BatchProcessor:
 
         if results is None:
             self.logger.error(f"LLM batch failed after retries: {last_error}")
-            return [{"ignore": True} for _ in queries]
+            return [
+                {"ignore": True, "ignore_source": IGNORE_SOURCE_FALLBACK} for _ in queries
+            ]
 
         # --- post-process validation: catch leaked entities ---
         for i, (query, result) in enumerate(zip(queries, results)):
             if result.get("ignore") is False and "template" in result:
-                leaked = self._find_leaked_entities(result["template"], reference_values)
+                with self.profiler.stage("validate"):
+                    leaked = self._find_leaked_entities(result["template"], leak_values)
                 if leaked:
+                    for item in leaked:
+                        self.registry.record_hit(item["label"], item["value"])
                     labels_missed = ", ".join(
                         f'"{l["value"]}"→{l["label"]}' for l in leaked
                     )
@@ -219,14 +345,68 @@ class BatchProcessor:
                         f"Leaked entities in query {i}: [{labels_missed}]. "
                         f"Retrying with correction hint."
                     )
-                    corrected = await self._retry_with_correction(
-                        query, result["template"], leaked, reference_values
-                    )
+                    with self.profiler.wait("correct"):
+                        corrected = await self._retry_with_correction(
+                            query, result["template"], leaked, reference_values
+                        )
                     if corrected is not None and len(corrected) == 1:
                         results[i] = corrected[0]
 
         return results
 
+    # ------------------------------------------------------------------
+    # Local ignore pre-classifier
+    # ------------------------------------------------------------------
+
+    def is_confident_ignore(self, query: str) -> bool:
+        """True when the local classifier alone is confident the query is out of domain."""
+        if self.ignore_classifier is None:
+            return False
+        return self.ignore_classifier.predict_proba(query) >= self.ignore_threshold
+
+    async def _process_with_preclassifier(
+        self,
+        queries: List[str],
+        reference_values: Dict[str, List[str]],
+        leak_values: Optional[Dict[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Answer confidently out-of-domain queries locally; send the rest to the LLM."""
+        if self.ignore_classifier is None:
+            return await self._process_batch_queries(
+                queries, reference_values, leak_values
+            )
+
+        results: List[Dict[str, Any]] = [
+            {"ignore": True, "ignore_source": IGNORE_SOURCE_CLASSIFIER} for _ in queries
+        ]
+        llm_indices: List[int] = []
+        audited: set = set()
+        for i, query in enumerate(queries):
+            if not self.is_confident_ignore(query):
+                llm_indices.append(i)
+            elif self.ignore_audit_rate and random.random() < self.ignore_audit_rate:
+                # Audit sample: still ask the LLM so we can measure real precision
+                llm_indices.append(i)
+                audited.add(i)
+            else:
+                self._ignore_routed += 1
+
+        if not llm_indices:
+            return results
+
+        llm_results = await self._process_batch_queries(
+            [queries[i] for i in llm_indices], reference_values, leak_values
+        )
+        for i, result in zip(llm_indices, llm_results):
+            results[i] = result
+            if i in audited:
+                self._ignore_audited += 1
+                if result.get("ignore") is True:
+                    self._ignore_audit_agree += 1
+                else:
+                    self.logger.info(f"Ignore audit disagreement: {queries[i]!r}")
+        return results
+
     async def _retry_with_correction(
         self,
         query: str,
@@ -235,18 +415,18 @@ class BatchProcessor:
         reference_values: Dict[str, List[str]],
     ) -> Optional[List[Dict[str, Any]]]:
         """Send a single correction retry to the LLM."""
-        correction_payload = self._build_correction_payload(
-            query, template, leaked, reference_values
-        )
+        with self.profiler.stage("encode"):
+            correction_payload = self._build_correction_payload(
+                query, template, leaked, reference_values
+            )
         try:
             raw = await self.client.chat_completion(
-                self.system_prompt, correction_payload
+                self.system_prompt,
+                correction_payload,
+                validator=lambda text: self._parse_results(text, 1),
+                kind="correction",
             )
-            content = self._sanitize_llm_output(raw)
-            corrected = json.loads(content)
-            if isinstance(corrected, list) and len(corrected) == 1:
-                if isinstance(corrected[0], dict) and "ignore" in corrected[0]:
-                    return corrected
+            return self._decode_results(self._parse_results(raw, 1), reference_values)
         except Exception as exc:
             self.logger.error(f"Correction retry failed: {exc}")
         return None
@@ -256,82 +436,218 @@ class BatchProcessor:
     # ------------------------------------------------------------------
 
     async def _handle_results(
-        self, queries: List[str], results: List[Dict[str, Any]]
+        self,
+        queries: List[str],
+        results: List[Dict[str, Any]],
+        ordinals: Optional[List[Optional[int]]] = None,
     ) -> None:
+        if ordinals is None:
+            ordinals = [None] * len(queries)
         async with self._write_lock:
-            for query, result in zip(queries, results):
+            for query, result, ordinal in zip(queries, results, ordinals):
                 # Update registry with any new entity values
                 if result.get("ignore") is False:
                     new_values = result.get("new_entity_values", {})
                     if isinstance(new_values, dict):
-                        self.registry.update_with_new_values(new_values)
-
-                # Write query + template to main output
-                if result.get("ignore") is True:
-                    output_obj = {"query": query, "ignore": True}
-                else:
-                    output_obj = {
-                        "query": query,
-                        "template": result.get("template", ""),
-                    }
-                self.writer.append_template_result(output_obj)
-
-                # Write template-only to separate file
-                if self.template_only_path and result.get("ignore") is False:
-                    template = result.get("template", "")
-                    if template:
-                        with open(self.template_only_path, "a", encoding="utf-8") as f:
-                            f.write(json.dumps(template, ensure_ascii=False) + ",\n")
+                        with self.profiler.stage("registry_update"):
+                            self.registry.update_with_new_values(new_values)
+
+                with self.profiler.stage("write"):
+                    # Write query + template to main output, keyed by input ordinal
+                    output_obj: Dict[str, Any] = {}
+                    if ordinal is not None:
+                        output_obj["id"] = ordinal
+                    output_obj["hash"] = query_hash(query)
+                    output_obj["query"] = query
+                    if result.get("ignore") is True:
+                        output_obj["ignore"] = True
+                        if "ignore_source" in result:
+                            output_obj["ignore_source"] = result["ignore_source"]
+                    else:
+                        output_obj["template"] = result.get("template", "")
+                    self.writer.append_template_result(output_obj)
+
+                    # Write template-only to the deduplicated store, or the legacy file
+                    if self.template_store is not None and result.get("ignore") is False:
+                        self.template_store.add(result.get("template", ""))
+                    elif self.template_only_path and result.get("ignore") is False:
+                        template = result.get("template", "")
+                        if template:
+                            with open(self.template_only_path, "a", encoding="utf-8") as f:
+                                f.write(json.dumps(template, ensure_ascii=False) + ",\n")
+            self.writer.flush()
+            # Templates must be on disk before resume can skip their queries
+            if self.template_store is not None:
+                self.template_store.flush(counts=False)
 
     async def _bounded_process(
         self,
         queries: List[str],
         reference_values: Dict[str, List[str]],
         semaphore: asyncio.Semaphore,
+        leak_values: Optional[Dict[str, List[str]]] = None,
+        ordinals: Optional[List[int]] = None,
     ) -> None:
         async with semaphore:
-            results = await self._process_batch_queries(queries, reference_values)
-            await self._handle_results(queries, results)
+            results = await self._process_with_preclassifier(
+                queries, reference_values, leak_values
+            )
+            await self._handle_results(queries, results, ordinals)
 
     async def run(self) -> None:
         if self.reset:
-            already_done = 0
+            already_done, done_ordinals = 0, set()
             self.logger.info("Reset flag enabled - processing all queries from the beginning")
         else:
-            already_done = count_lines(self.output_path)
-            self.logger.info(f"Skipping {already_done} already processed queries")
+            already_done, done_ordinals = resume_point(self.output_path)
+            self.logger.info(
+                f"Skipping {already_done + len(done_ordinals)} already processed queries"
+            )
 
+        await self.warm_up()
         semaphore = asyncio.Semaphore(self.concurrency)
+        # Up to `concurrency` batches in flight; reading pauses while all slots are busy
+        pending: Dict[asyncio.Task, int] = {}
         batch: List[str] = []
+        ordinals: List[int] = []
         total_processed = 0
+        report_every = self.batch_size * 10
+        next_report = report_every
 
-        for line in read_jsonl_lines(self.input_path, already_done):
-            try:
-                query = json.loads(line)
-                if not isinstance(query, str):
-                    raise ValueError("Query line is not a JSON string")
-            except Exception:
-                # Skip invalid lines
-                continue
+        try:
+            records = self.profiler.iter_stage(
+                "read", read_jsonl_records(self.input_path, already_done)
+            )
+            for ordinal, line in records:
+                if ordinal in done_ordinals:
+                    continue
+                try:
+                    with self.profiler.stage("parse_input"):
+                        query = json.loads(line)
+                        if not isinstance(query, str):
+                            raise ValueError("Query line is not a JSON string")
+                except Exception:
+                    # Skip invalid lines
+                    continue
+
+                batch.append(query)
+                ordinals.append(ordinal)
+                if len(batch) >= self.batch_size:
+                    total_processed += await self._wait_for_slot(pending, self.concurrency)
+                    # Log progress every 10 batches (or every batch_size * 10 queries)
+                    if total_processed >= next_report:
+                        self.logger.info(f"✓ Processed {total_processed} queries...")
+                        next_report = (total_processed // report_every + 1) * report_every
+                    task = asyncio.create_task(
+                        self._process_batch_group(batch, semaphore, ordinals)
+                    )
+                    pending[task] = len(batch)
+                    batch = []
+                    ordinals = []
+
+            if batch:
+                task = asyncio.create_task(self._process_batch_group(batch, semaphore, ordinals))
+                pending[task] = len(batch)
+            total_processed += await self._wait_for_slot(pending, 1)
+        except BaseException:
+            # One failed batch stops the run; don't leave the others writing behind it
+            await self._cancel_pending(pending)
+            raise
 
-            batch.append(query)
-            if len(batch) >= self.batch_size:
-                await self._process_batch_group(batch, semaphore)
-                total_processed += len(batch)
-                # Log progress every 10 batches (or every batch_size * 10 queries)
-                if total_processed % (self.batch_size * 10) == 0:
-                    self.logger.info(f"✓ Processed {total_processed} queries...")
-                batch = []
-
-        if batch:
-            await self._process_batch_group(batch, semaphore)
-            total_processed += len(batch)
-        
         self.logger.info(f"✅ Total processed: {total_processed} queries")
+        self.flush()
+        if self.client.hedge_percentile is not None:
+            stats = self.client.get_hedge_stats()
+            self.logger.info(
+                f"Hedging: {stats['hedges_launched']} hedges over {stats['calls']} calls, "
+                f"{stats['hedge_wins']} won ({stats['hedge_win_rate']:.1%}), "
+                f"{stats['hedges_skipped_budget']} skipped by budget"
+            )
+        self.log_transport_stats()
+        if self.ignore_classifier is not None:
+            agree = (
+                f"{self._ignore_audit_agree / self._ignore_audited:.1%}"
+                if self._ignore_audited else "n/a"
+            )
+            self.logger.info(
+                f"Ignore classifier: {self._ignore_routed} queries skipped the LLM, "
+                f"{self._ignore_audited} audited (agreement {agree})"
+            )
+
+    @staticmethod
+    async def _wait_for_slot(pending: Dict[asyncio.Task, int], limit: int) -> int:
+        """Wait until fewer than ``limit`` batches are pending; returns queries completed."""
+        completed = 0
+        while len(pending) >= limit:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                completed += pending.pop(task)
+                # Re-raise failures here, as the sequential loop used to
+                task.result()
+        return completed
+
+    @staticmethod
+    async def _cancel_pending(pending: Dict[asyncio.Task, int]) -> None:
+        """Cancel the batches still in flight and wait for them to unwind."""
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        pending.clear()
 
     async def _process_batch_group(
-        self, batch: List[str], semaphore: asyncio.Semaphore
+        self,
+        batch: List[str],
+        semaphore: asyncio.Semaphore,
+        ordinals: Optional[List[int]] = None,
     ) -> None:
         """Process a single batch group."""
-        reference_values = self.registry.get_reference_values()
-        await self._bounded_process(batch, reference_values, semaphore)
+        with self.profiler.stage("batch_build"):
+            reference_values = self.registry.get_reference_values()
+            leak_values = self.registry.get_leak_check_values()
+        await self._bounded_process(
+            batch, reference_values, semaphore, leak_values, ordinals
+        )
+
+    async def warm_up(self) -> None:
+        """Pre-open keep-alive connections so the first batches skip TCP/TLS setup."""
+        if self.warmup_connections <= 0:
+            return
+        opened = await self.client.warm_up(self.warmup_connections)
+        self.logger.info(f"Warmed up {opened}/{self.warmup_connections} connections")
+
+    def log_transport_stats(self) -> None:
+        stats = self.client.get_transport_stats()
+        if not stats["requests"]:
+            return
+        phases = stats["phases_ms"]
+
+        def ms(value: Optional[float]) -> str:
+            return f"{value:.0f}ms" if value is not None else "n/a"
+
+        self.logger.info(
+            f"Transport: {stats['requests']} requests, {stats['new_connections']} new connections "
+            f"(reuse {stats['connection_reuse']:.1%}), peak in-flight {stats['peak_inflight']}; "
+            f"p95 pool_wait {ms(phases['pool_wait']['p95'])}, "
+            f"connect {ms(phases['connect']['p95'])}, "
+            f"ttfb {ms(phases['ttfb']['p95'])}, body {ms(phases['body']['p95'])}"
+        )
+
+    def flush(self) -> None:
+        """Persist registry hit counts and template store counts."""
+        self.registry.flush()
+        self.writer.flush()
+        if self.template_store is not None:
+            self.template_store.flush()
+
+    async def process_queries(
+        self, queries: List[str], ordinals: Optional[List[Optional[int]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Process and write one batch outside of run(); used by the long-running modes."""
+        with self.profiler.stage("batch_build"):
+            reference_values = self.registry.get_reference_values()
+            leak_values = self.registry.get_leak_check_values()
+        results = await self._process_with_preclassifier(
+            queries, reference_values, leak_values
+        )
+        await self._handle_results(queries, results, ordinals)
+        return results
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 
 ENTITY_LABELS = [
@@ -290,11 +290,39 @@ class EntityValueRegistry:
         },
     }
 
-    def __init__(self, storage_path: str):
+    def __init__(
+        self,
+        storage_path: str,
+        max_values_per_label: Optional[int] = None,
+        archive_path: Optional[str] = None,
+        max_archived_per_label: Optional[int] = None,
+        read_only: bool = False,
+    ):
         self.storage_path = storage_path
+        # Dry runs and reports load (and cap) the registry without writing it back
+        self.read_only = read_only
+        self.max_values_per_label = max_values_per_label
+        # Archived values are only ever deleted when this is set explicitly
+        self.max_archived_per_label = max_archived_per_label
+        self.archive_path = archive_path or (
+            os.path.splitext(storage_path)[0] + "_archive.json"
+        )
         self._values = {k: list(v) for k, v in ENTITY_VALUES.items()}
         self._lower_sets = {k: {val.lower() for val in v} for k, v in self._values.items()}
+        self._seed_sets = {k: {val.lower() for val in v} for k, v in ENTITY_VALUES.items()}
+        # Cold values evicted from the prompt reference; still used for leak checks
+        self._archived: Dict[str, Dict[str, str]] = {}
+        # Hit counts only matter for eviction, so they are kept only under a cap
+        self._hits: Dict[str, Dict[str, int]] = {}
+        self._hits_dirty = False
+        self._archive_dirty = False
+        self._reference_view: Optional[Dict[str, List[str]]] = None
+        self._leak_view: Optional[Dict[str, List[str]]] = None
         self._load_existing()
+        self._load_archive()
+        evicted = [self._enforce_cap(label) for label in list(self._values)]
+        if any(evicted):
+            self._persist()
 
     def _load_existing(self) -> None:
         if not os.path.exists(self.storage_path):
@@ -314,6 +342,44 @@ class EntityValueRegistry:
                 if isinstance(val, str):
                     self._add_value(label, val)
 
+    def _load_archive(self) -> None:
+        """Load archived values and hit counts left by earlier capped runs.
+
+        Without a cap there is nothing to keep out of the prompt, so archived
+        values are merged back into the active set instead of being lost.
+        """
+        if not os.path.exists(self.archive_path):
+            return
+        try:
+            with open(self.archive_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if not isinstance(data, dict):
+            return
+        for label, counts in (data.get("hits") or {}).items():
+            if isinstance(counts, dict):
+                self._hits[label] = {
+                    k: v for k, v in counts.items() if isinstance(v, int)
+                }
+        for label, values in (data.get("archived") or {}).items():
+            if not isinstance(values, list):
+                continue
+            if self.max_values_per_label is None:
+                self._ensure_label(label)
+                for val in values:
+                    if isinstance(val, str):
+                        self._add_value(label, val)
+                continue
+            for val in values:
+                if not isinstance(val, str):
+                    continue
+                lowered = val.lower()
+                if lowered in self._lower_sets.get(label, set()):
+                    continue
+                self._archived.setdefault(label, {})[lowered] = val
+            self._trim_archive(label)
+
     def _ensure_label(self, label: str) -> None:
         if label not in self._values:
             self._values[label] = []
@@ -331,31 +397,156 @@ class EntityValueRegistry:
             return False
         if self._is_blocked(label, value):
             return False
+        # Re-proposed archived values come back with their original spelling
+        archived = self._archived.get(label, {})
+        if lowered in archived:
+            value = archived.pop(lowered)
+            self._archive_dirty = True
         self._values[label].append(value)
         self._lower_sets[label].add(lowered)
+        self._invalidate_views()
+        return True
+
+    def _invalidate_views(self) -> None:
+        self._reference_view = None
+        self._leak_view = None
+
+    # ------------------------------------------------------------------
+    # Usage counts & eviction
+    # ------------------------------------------------------------------
+
+    def record_hit(self, label: str, value: str) -> None:
+        if self.max_values_per_label is None:
+            return
+        counts = self._hits.setdefault(label, {})
+        lowered = value.lower()
+        counts[lowered] = counts.get(lowered, 0) + 1
+        self._hits_dirty = True
+
+    def _enforce_cap(self, label: str) -> bool:
+        """Archive the coldest non-seed values beyond the cap; seeds never count toward it."""
+        if self.max_values_per_label is None:
+            return False
+        values = self._values.get(label, [])
+        seeds = self._seed_sets.get(label, set())
+        counts = self._hits.get(label, {})
+        candidates = [
+            (counts.get(val.lower(), 0), pos, val)
+            for pos, val in enumerate(values)
+            if val.lower() not in seeds
+        ]
+        excess = len(candidates) - self.max_values_per_label
+        if excess <= 0:
+            return False
+        # Lowest hit count first; among equals, the oldest insertion goes first
+        evictable = sorted(candidates)[:excess]
+        evicted = {val.lower() for _, _, val in evictable}
+        archive = self._archived.setdefault(label, {})
+        for hits, _, val in evictable:
+            archive[val.lower()] = val
+            if hits <= 1:
+                # One-off values keep no counter once archived
+                counts.pop(val.lower(), None)
+        self._values[label] = [v for v in values if v.lower() not in evicted]
+        self._lower_sets[label] -= evicted
+        self._archive_dirty = True
+        self._trim_archive(label)
+        self._invalidate_views()
         return True
 
+    def _trim_archive(self, label: str) -> None:
+        """Drop the coldest archived values (and their counters) beyond the archive cap.
+
+        Opt-in: only runs when max_archived_per_label was given.
+        """
+        archive = self._archived.get(label)
+        if not archive or self.max_archived_per_label is None:
+            return
+        excess = len(archive) - self.max_archived_per_label
+        if excess <= 0:
+            return
+        counts = self._hits.get(label, {})
+        # Dict order is archive order, so ties drop the longest-archived value
+        coldest = sorted(
+            (counts.get(lowered, 0), pos, lowered) for pos, lowered in enumerate(archive)
+        )[:excess]
+        for _, _, lowered in coldest:
+            del archive[lowered]
+            counts.pop(lowered, None)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
     def get_reference_values(self) -> Dict[str, List[str]]:
-        return {k: list(v) for k, v in self._values.items()}
+        """Active values only; this is what goes into the prompt. Shared; do not mutate."""
+        if self._reference_view is None:
+            self._reference_view = {k: list(v) for k, v in self._values.items()}
+        return self._reference_view
+
+    def get_leak_check_values(self) -> Dict[str, List[str]]:
+        """Active plus archived values, for local leaked-entity checks. Shared; do not mutate."""
+        if self._leak_view is None:
+            merged = {k: list(v) for k, v in self._values.items()}
+            for label, archived in self._archived.items():
+                merged.setdefault(label, []).extend(archived.values())
+            self._leak_view = merged
+        return self._leak_view
 
     def get_entity_labels(self) -> List[str]:
         return list(ENTITY_LABELS)
 
     def update_with_new_values(self, new_values: Dict[str, List[str]]) -> bool:
+        """Add proposed values; True only if the active set actually changed."""
         changed = False
         for label, values in new_values.items():
             if not isinstance(values, list):
                 continue
             self._ensure_label(label)
+            before = set(self._lower_sets[label])
+            added = False
             for val in values:
                 if isinstance(val, str):
+                    if self._is_blocked(label, val):
+                        continue
+                    self.record_hit(label, val)
                     if self._add_value(label, val):
-                        changed = True
+                        added = True
+            if added:
+                self._enforce_cap(label)
+                if self._lower_sets[label] != before:
+                    changed = True
         if changed:
             self._persist()
         return changed
 
+    def flush(self) -> None:
+        """Persist hit counters that changed since the last write."""
+        if self._hits_dirty:
+            self._persist_archive()
+
     def _persist(self) -> None:
+        if self.read_only:
+            return
         os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
         with open(self.storage_path, "w", encoding="utf-8") as f:
             json.dump(self._values, f, ensure_ascii=False, indent=2)
+        # Hit counts alone wait for flush(); archive moves are written with the values
+        if self._archive_dirty:
+            self._persist_archive()
+
+    def _persist_archive(self) -> None:
+        # Without a cap nothing is archived or counted, so no sidecar is written
+        if self.read_only or self.max_values_per_label is None:
+            return
+        if not self._archived and not self._hits:
+            return
+        os.makedirs(os.path.dirname(self.archive_path) or ".", exist_ok=True)
+        data = {
+            "archived": {k: list(v.values()) for k, v in self._archived.items() if v},
+            "hits": self._hits,
+        }
+        with open(self.archive_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        self._hits_dirty = False
+        self._archive_dirty = False
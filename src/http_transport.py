@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+
+PHASES = ("pool_wait", "connect", "ttfb", "body", "total")
+# Request extension that keeps a request out of TransportStats (e.g. warm-up HEADs)
+UNTRACED = "template_generator.untraced"
+
+
+def _percentile(samples: Any, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+class TransportStats:
+    """Per-phase request timings collected from httpcore trace events."""
+
+    def __init__(self, window: int = 5000):
+        self._phases: Dict[str, deque] = {p: deque(maxlen=window) for p in PHASES}
+        self.requests = 0
+        self.new_connections = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    def record(self, phases: Dict[str, float], new_connection: bool) -> None:
+        self.requests += 1
+        if new_connection:
+            self.new_connections += 1
+        for name, value in phases.items():
+            self._phases[name].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "connection_reuse": (
+                1 - self.new_connections / self.requests if self.requests else None
+            ),
+            "inflight": self.inflight,
+            "peak_inflight": self.peak_inflight,
+            "phases_ms": {
+                name: {
+                    "p50": _percentile(samples, 50),
+                    "p95": _percentile(samples, 95),
+                    "p99": _percentile(samples, 99),
+                }
+                for name, samples in self._phases.items()
+            },
+        }
+
+
+class _RequestTrace:
+    """Collects trace timestamps for one request and reports phases once the body is read."""
+
+    def __init__(self, stats: TransportStats, started: float):
+        self.stats = stats
+        self.started = started
+        self.events: Dict[str, float] = {}
+        self.done = False
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        # Event names look like "connection.connect_tcp.started" or
+        # "http11.receive_response_body.complete"; keep the last two parts.
+        key = ".".join(event_name.split(".")[-2:])
+        now = time.perf_counter()
+        self.events.setdefault(key, now)
+        if key in ("receive_response_body.complete", "response_closed.complete"):
+            self.finish(now)
+
+    def finish(self, now: float) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.stats.inflight -= 1
+        ev = self.events
+        first = min(ev.values()) if ev else now
+        connect = 0.0
+        if "connect_tcp.started" in ev:
+            end = ev.get("start_tls.complete", ev.get("connect_tcp.complete", first))
+            connect = end - ev["connect_tcp.started"]
+        sent = ev.get("send_request_headers.started", first)
+        headers = ev.get("receive_response_headers.complete", now)
+        phases = {
+            # Time spent waiting for a pooled connection before anything happened on the wire
+            "pool_wait": first - self.started,
+            "connect": connect,
+            "ttfb": headers - sent,
+            "body": ev.get("receive_response_body.complete", now) - headers,
+            "total": now - self.started,
+        }
+        self.stats.record({k: v * 1000.0 for k, v in phases.items()}, "connect_tcp.started" in ev)
+
+
+class TracingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: TransportStats, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.extensions.get(UNTRACED):
+            return await super().handle_async_request(request)
+        trace = _RequestTrace(self.stats, time.perf_counter())
+        request.extensions["trace"] = trace
+        self.stats.inflight += 1
+        self.stats.peak_inflight = max(self.stats.peak_inflight, self.stats.inflight)
+        try:
+            return await super().handle_async_request(request)
+        except BaseException:
+            # Cancellation too, or inflight would never come back down
+            trace.finish(time.perf_counter())
+            raise
+
+
+def build_http_client(
+    concurrency: int,
+    http2: bool = False,
+    connect_timeout: float = 10.0,
+    read_timeout: float = 120.0,
+    keepalive_expiry: float = 60.0,
+    headroom: float = 0.1,
+) -> Tuple[httpx.AsyncClient, TransportStats, httpx.Timeout]:
+    """httpx client whose pool fits ``concurrency`` in-flight calls plus hedging headroom."""
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            raise RuntimeError("HTTP/2 transport requires the h2 package (pip install 'httpx[http2]')")
+    pool_size = max(1, int(concurrency * (1 + headroom)) + 1)
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_expiry,
+    )
+    # Pool timeout matches read timeout so saturation shows up as pool_wait, not errors
+    timeout = httpx.Timeout(
+        connect=connect_timeout, read=read_timeout, write=connect_timeout, pool=read_timeout
+    )
+    stats = TransportStats()
+    transport = TracingTransport(stats, http2=http2, limits=limits)
+    client = httpx.AsyncClient(transport=transport, timeout=timeout, limits=limits, http2=http2)
+    return client, stats, timeout
@@ -0,0 +1,199 @@
+import argparse
+import json
+import math
+import os
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Ignore records that were not decided by the LLM carry an "ignore_source"
+# marker, so retraining never learns from its own predictions or failures.
+IGNORE_SOURCE_CLASSIFIER = "classifier"
+IGNORE_SOURCE_FALLBACK = "fallback"
+
+
+def _hash(feature: str, n_features: int) -> int:
+    # crc32 rather than hash() so features are stable across processes
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+def iter_labelled_queries(path: str) -> Iterator[Tuple[str, bool]]:
+    """Yield (query, is_ignore) pairs for LLM decisions in a templates_output.jsonl file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(record, dict):
+                continue
+            query = record.get("query")
+            if not isinstance(query, str):
+                continue
+            if "ignore_source" in record:
+                continue
+            if record.get("ignore") is True:
+                yield query, True
+            elif record.get("template"):
+                yield query, False
+
+
+def _is_holdout(query: str, holdout_pct: int) -> bool:
+    return zlib.crc32(query.encode("utf-8")) % 100 < holdout_pct
+
+
+class IgnoreClassifier:
+    """Hashed n-gram logistic regression that predicts the LLM's ``ignore`` flag."""
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        weights: Optional[Dict[int, float]] = None,
+        bias: float = 0.0,
+        calibration: Optional[List[Tuple[float, float, float]]] = None,
+    ):
+        self.n_features = n_features
+        self.weights: List[float] = [0.0] * n_features
+        for idx, w in (weights or {}).items():
+            self.weights[int(idx)] = w
+        self.bias = bias
+        # (threshold, precision, recall) for the "ignore" class, threshold descending
+        self.calibration: List[Tuple[float, float, float]] = calibration or []
+
+    # ------------------------------------------------------------------
+    # Features & scoring
+    # ------------------------------------------------------------------
+
+    def _features(self, query: str) -> List[int]:
+        text = query.lower().strip()
+        words = _TOKEN_RE.findall(text)
+        feats = [f"w:{w}" for w in words]
+        feats.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        padded = f" {' '.join(words)} "
+        feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        feats.append(f"len:{min(len(words), 12)}")
+        return sorted({_hash(feat, self.n_features) for feat in feats})
+
+    def _score(self, features: List[int]) -> float:
+        z = self.bias + sum(self.weights[i] for i in features)
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def predict_proba(self, query: str) -> float:
+        """Probability that the LLM would return ``{"ignore": true}`` for the query."""
+        return self._score(self._features(query))
+
+    # ------------------------------------------------------------------
+    # Training & calibration
+    # ------------------------------------------------------------------
+
+    def fit(
+        self,
+        data_path: str,
+        epochs: int = 5,
+        learning_rate: float = 0.2,
+        l2: float = 1e-6,
+        holdout_pct: int = 10,
+    ) -> None:
+        """Train with streaming SGD over the labelled file; memory stays at the weight vector."""
+        for epoch in range(epochs):
+            lr = learning_rate / (1 + epoch)
+            for query, label in iter_labelled_queries(data_path):
+                if _is_holdout(query, holdout_pct):
+                    continue
+                features = self._features(query)
+                grad = self._score(features) - (1.0 if label else 0.0)
+                for i in features:
+                    self.weights[i] -= lr * (grad + l2 * self.weights[i])
+                self.bias -= lr * grad
+        self.calibrate(data_path, holdout_pct)
+
+    def calibrate(self, data_path: str, holdout_pct: int = 10, points: int = 200) -> None:
+        """Build the precision/recall curve for the ignore class on the holdout split."""
+        scored = [
+            (self.predict_proba(query), label)
+            for query, label in iter_labelled_queries(data_path)
+            if _is_holdout(query, holdout_pct)
+        ]
+        positives = sum(1 for _, label in scored if label)
+        if not scored or not positives:
+            self.calibration = []
+            return
+        scored.sort(key=lambda x: x[0], reverse=True)
+        step = max(1, len(scored) // points)
+        curve: List[Tuple[float, float, float]] = []
+        tp = 0
+        for rank, (score, label) in enumerate(scored, start=1):
+            if label:
+                tp += 1
+            if rank % step == 0 or rank == len(scored):
+                curve.append((score, tp / rank, tp / positives))
+        self.calibration = curve
+
+    def operating_point(self, min_precision: float) -> Optional[Tuple[float, float, float]]:
+        """Lowest-threshold curve point whose holdout precision stays at or above ``min_precision``."""
+        point = None
+        for score, precision, recall in self.calibration:
+            if precision < min_precision:
+                break
+            point = (score, precision, recall)
+        return point
+
+    def threshold_for_precision(self, min_precision: float) -> Optional[float]:
+        point = self.operating_point(min_precision)
+        return point[0] if point else None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = {
+            "n_features": self.n_features,
+            "bias": self.bias,
+            "weights": {str(i): w for i, w in enumerate(self.weights) if w},
+            "calibration": self.calibration,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IgnoreClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            n_features=data["n_features"],
+            weights=data.get("weights", {}),
+            bias=data.get("bias", 0.0),
+            calibration=[tuple(p) for p in data.get("calibration", [])],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the local ignore pre-classifier")
+    parser.add_argument("--data", required=True, help="Labelled output JSONL (query + template/ignore)")
+    parser.add_argument("--model", required=True, help="Where to write the model JSON")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--holdout-pct", type=int, default=10, help="Percent of queries held out for calibration")
+    args = parser.parse_args()
+
+    clf = IgnoreClassifier()
+    clf.fit(args.data, epochs=args.epochs, holdout_pct=args.holdout_pct)
+    clf.save(args.model)
+    for target in (0.9, 0.95, 0.98, 0.99):
+        point = clf.operating_point(target)
+        if point is None:
+            print(f"precision>={target:.2f}: not reachable on holdout")
+        else:
+            print(f"precision>={target:.2f}: threshold={point[0]:.3f} recall={point[2]:.2%}")
+
+
+if __name__ == "__main__":
+    main()
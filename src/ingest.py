@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Keyword lists carried over from the analysis notebook's non-bus transport filter
+FLIGHT_KEYWORDS = ["flight", "airline", "airways", "aircraft", "airport", "terminal",
+                   "boarding pass", "check-in counter"]
+TRAIN_KEYWORDS = ["train", "irctc", "rail", "tatkal", "pnr", "rac", "waitlist", "waitlisted",
+                  "chart preparation", "railway", "berth", "1a", "2a", "3a",
+                  "rajdhani", "shatabdi", "express train", "duronto", "coach number"]
+HOTEL_KEYWORDS = ["hotel", "resort", "stay at", "accommodation", "room booking",
+                  "check-in time", "check-out", "nights stay", "lodge", "guest house"]
+CAR_KEYWORDS = ["cab", "taxi", "car rental", "outstation car", "sedan", "suv",
+                "hatchback", "tempo traveller", "innova", "ertiga",
+                "roof carrier", "per km", "km charges", "driver details",
+                "driver language", "luggage capacity", "toll tax"]
+OTHER_TRANSPORT_KEYWORDS = FLIGHT_KEYWORDS + TRAIN_KEYWORDS + HOTEL_KEYWORDS + CAR_KEYWORDS
+
+
+def is_mostly_ascii(text: str) -> bool:
+    """Reject text where 5% or more of the letters are non-ASCII (allows symbols like ₹)."""
+    non_ascii_letters = sum(1 for c in text if ord(c) > 127 and c.isalpha())
+    total_letters = sum(1 for c in text if c.isalpha())
+    if total_letters == 0:
+        return True
+    return (non_ascii_letters / total_letters) < 0.05
+
+
+def has_multiple_words(text: str) -> bool:
+    return len(text.strip().split()) > 1
+
+
+def is_other_transport(text: str) -> bool:
+    """True for queries about flights/trains/hotels/cabs that never mention a bus."""
+    lowered = text.lower()
+    if "bus" in lowered:
+        return False
+    if len(text.strip()) < 5:
+        return True
+    return any(keyword in lowered for keyword in OTHER_TRANSPORT_KEYWORDS)
+
+
+def shard_of(query: str, num_shards: int) -> int:
+    return zlib.crc32(query.encode("utf-8")) % num_shards
+
+
+# ----------------------------------------------------------------------
+# Stage 1: read
+# ----------------------------------------------------------------------
+
+def _iter_records(path: str) -> Iterator[Any]:
+    """Stream records from a JSON array (via ijson) or a JSONL file."""
+    with open(path, "rb") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == b"[":
+            try:
+                import ijson
+            except ImportError:
+                raise RuntimeError("Streaming a JSON array dump requires ijson (pip install ijson)")
+            yield from ijson.items(f, "item")
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except Exception:
+                yield None
+
+
+def read_chunks(path: str, chunk_size: int, lob: Optional[str]) -> Iterator[Tuple[List[str], Counter]]:
+    """Yield (queries, counts) chunks; records outside ``lob`` are dropped here."""
+    chunk: List[str] = []
+    counts: Counter = Counter()
+    for record in _iter_records(path):
+        counts["read"] += 1
+        if isinstance(record, dict):
+            if lob and record.get("lob") != lob:
+                counts["dropped_lob"] += 1
+                continue
+            query = record.get("query")
+        else:
+            query = record
+        if not isinstance(query, str) or not query.strip():
+            counts["dropped_empty"] += 1
+            continue
+        chunk.append(query.strip())
+        if len(chunk) >= chunk_size:
+            yield chunk, counts
+            chunk, counts = [], Counter()
+    if chunk or counts:
+        yield chunk, counts
+
+
+# ----------------------------------------------------------------------
+# Stage 2: filter (worker processes)
+# ----------------------------------------------------------------------
+
+def _filter_chunk(
+    queries: List[str], options: Dict[str, Any]
+) -> Tuple[Dict[int, List[str]], Counter]:
+    counts: Counter = Counter()
+    shards: Dict[int, List[str]] = {}
+    for query in queries:
+        if options["ascii"] and not is_mostly_ascii(query):
+            counts["dropped_non_ascii"] += 1
+            continue
+        if options["multiword"] and not has_multiple_words(query):
+            counts["dropped_single_word"] += 1
+            continue
+        if options["transport"] and is_other_transport(query):
+            counts["dropped_other_transport"] += 1
+            continue
+        counts["filtered"] += 1
+        shards.setdefault(shard_of(query, options["num_shards"]), []).append(query)
+    return shards, counts
+
+
+# ----------------------------------------------------------------------
+# Stage 3: dedup + emit (one worker per shard)
+# ----------------------------------------------------------------------
+
+def _dedup_lines(lines: Iterator[str], dst: Any, counts: Counter) -> None:
+    seen: set = set()
+    for line in lines:
+        query = json.loads(line)
+        if query in seen:
+            counts["dropped_duplicate"] += 1
+            continue
+        seen.add(query)
+        dst.write(line)
+        counts["written"] += 1
+
+
+def _spill(partition_path: str, num_shards: int, num_spills: int) -> List[str]:
+    """Split a partition into ``num_spills`` files by a second hash of the query.
+
+    shard_of() already used crc32 % num_shards, so the quotient picks the
+    spill file; every copy of a query still lands in the same one.
+    """
+    paths = [f"{partition_path}.spill-{i:04d}" for i in range(num_spills)]
+    spills = [open(p, "w", encoding="utf-8") for p in paths]
+    try:
+        with open(partition_path, "r", encoding="utf-8") as src:
+            for line in src:
+                crc = zlib.crc32(json.loads(line).encode("utf-8"))
+                spills[(crc // num_shards) % num_spills].write(line)
+    finally:
+        for f in spills:
+            f.close()
+    return paths
+
+
+def _dedup_shard(
+    partition_path: str, output_path: str, num_shards: int = 1, num_spills: int = 1
+) -> Counter:
+    """Exact dedup of one hash partition; every copy of a query lands in the same shard.
+
+    With ``num_spills`` > 1 the partition is first split so that only one
+    spill file's queries are held in memory at a time. Output order is then
+    input order within each spill file, not across the shard.
+    """
+    counts: Counter = Counter()
+    if num_spills <= 1:
+        paths = [partition_path]
+    else:
+        paths = _spill(partition_path, num_shards, num_spills)
+        os.remove(partition_path)
+    with open(output_path, "w", encoding="utf-8") as dst:
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as src:
+                _dedup_lines(src, dst, counts)
+            os.remove(path)
+    return counts
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        input_path: str,
+        output_dir: str,
+        num_shards: int = 8,
+        workers: Optional[int] = None,
+        chunk_size: int = 50000,
+        lob: Optional[str] = None,
+        max_dedup_rows: int = 2_000_000,
+        ascii_filter: bool = True,
+        multiword_filter: bool = True,
+        transport_filter: bool = True,
+    ):
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.num_shards = num_shards
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.lob = lob
+        # Rows one dedup worker may hold in its seen-set; larger shards are spilled
+        self.max_dedup_rows = max_dedup_rows
+        self._partition_rows = [0] * num_shards
+        self.options = {
+            "ascii": ascii_filter,
+            "multiword": multiword_filter,
+            "transport": transport_filter,
+            "num_shards": num_shards,
+        }
+        self.counts: Counter = Counter()
+        self.timings: Dict[str, float] = {}
+
+    def _partition_path(self, shard: int) -> str:
+        return os.path.join(self.output_dir, f".partition-{shard:05d}.jsonl")
+
+    def shard_path(self, shard: int) -> str:
+        return os.path.join(self.output_dir, f"queries-{shard:05d}-of-{self.num_shards:05d}.jsonl")
+
+    def _collect(self, future: Future, partitions: List[Any]) -> None:
+        shards, counts = future.result()
+        self.counts.update(counts)
+        for shard, queries in shards.items():
+            self._partition_rows[shard] += len(queries)
+            partitions[shard].writelines(
+                json.dumps(q, ensure_ascii=False) + "\n" for q in queries
+            )
+
+    def _filter_stage(self, pool: ProcessPoolExecutor) -> None:
+        partitions = [
+            open(self._partition_path(i), "w", encoding="utf-8") for i in range(self.num_shards)
+        ]
+        start = time.perf_counter()
+        read_time = 0.0
+        chunks = read_chunks(self.input_path, self.chunk_size, self.lob)
+        # Keep at most 2 chunks per worker in flight so memory stays bounded;
+        # results are collected in submission order so shards keep input order
+        in_flight: List[Future] = []
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = next(chunks, None)
+                read_time += time.perf_counter() - t0
+                if item is None:
+                    break
+                queries, read_counts = item
+                self.counts.update(read_counts)
+                in_flight.append(pool.submit(_filter_chunk, queries, self.options))
+                if len(in_flight) >= self.workers * 2:
+                    self._collect(in_flight.pop(0), partitions)
+            while in_flight:
+                self._collect(in_flight.pop(0), partitions)
+        finally:
+            for f in partitions:
+                f.close()
+        self.timings["read"] = read_time
+        self.timings["filter"] = time.perf_counter() - start - read_time
+
+    def _dedup_stage(self, pool: ProcessPoolExecutor) -> None:
+        start = time.perf_counter()
+        futures = [
+            pool.submit(
+                _dedup_shard,
+                self._partition_path(i),
+                self.shard_path(i),
+                self.num_shards,
+                -(-self._partition_rows[i] // self.max_dedup_rows),
+            )
+            for i in range(self.num_shards)
+        ]
+        for future in futures:
+            self.counts.update(future.result())
+        self.timings["dedup_write"] = time.perf_counter() - start
+
+    def run(self) -> Dict[str, Any]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._filter_stage(pool)
+            self._dedup_stage(pool)
+        self.timings["total"] = time.perf_counter() - start
+        stats = {
+            "input": self.input_path,
+            "shards": [self.shard_path(i) for i in range(self.num_shards)],
+            "counts": dict(self.counts),
+            "timings_s": {k: round(v, 3) for k, v in self.timings.items()},
+        }
+        with open(os.path.join(self.output_dir, "ingest_stats.json"), "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream a raw querybank dump into filtered, deduplicated JSONL shards")
+    parser.add_argument("--input", required=True, help="Raw dump (JSON array of {query, lob, ...} or JSONL)")
+    parser.add_argument("--output-dir", required=True, help="Directory for queries-XXXXX-of-XXXXX.jsonl shards")
+    parser.add_argument("--shards", type=int, default=8, help="Number of output shards")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Queries per filter task")
+    parser.add_argument("--lob", default=None, help="Keep only records with this lob (e.g. BUS)")
+    parser.add_argument(
+        "--max-dedup-rows",
+        type=int,
+        default=2_000_000,
+        help="Max rows a dedup worker holds in memory; larger shards are spilled to more files",
+    )
+    parser.add_argument("--keep-non-ascii", action="store_true", help="Skip the is_mostly_ascii filter")
+    parser.add_argument("--keep-single-word", action="store_true", help="Skip the has_multiple_words filter")
+    parser.add_argument("--keep-other-transport", action="store_true", help="Skip the flight/train/hotel/cab filter")
+    args = parser.parse_args()
+
+    pipeline = IngestPipeline(
+        input_path=args.input,
+        output_dir=args.output_dir,
+        num_shards=args.shards,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        lob=args.lob,
+        max_dedup_rows=args.max_dedup_rows,
+        ascii_filter=not args.keep_non_ascii,
+        multiword_filter=not args.keep_single_word,
+        transport_filter=not args.keep_other_transport,
+    )
+    stats = pipeline.run()
+
+    print(f"{'stage':<28}{'rows':>12}")
+    for key in ("read", "dropped_lob", "dropped_empty", "dropped_non_ascii",
+                "dropped_single_word", "dropped_other_transport", "filtered",
+                "dropped_duplicate", "written"):
+        print(f"{key:<28}{stats['counts'].get(key, 0):>12,}")
+    for stage, seconds in stats["timings_s"].items():
+        print(f"⏱  {stage}: {seconds:.2f}s")
+    print(f"✅ Wrote {args.shards} shards to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
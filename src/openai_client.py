@@ -1,11 +1,29 @@
+import asyncio
 import os
-from typing import Any
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Callable, Dict, Optional
 
 from openai import AsyncAzureOpenAI
 
+from src.http_transport import UNTRACED, build_http_client
+
 
 class AzureOpenAIClient:
-    def __init__(self, max_tokens: int = 512):
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        hedge_percentile: Optional[float] = None,
+        hedge_budget: float = 0.05,
+        hedge_min_samples: int = 20,
+        hedge_window: int = 500,
+        hedge_deployment: Optional[str] = None,
+        concurrency: int = 100,
+        http2: bool = False,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        keepalive_expiry: float = 60.0,
+    ):
         api_key = os.environ.get("AZURE_OPENAI_API_KEY")
         endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
         api_version = os.environ.get("AZURE_OPENAI_API_VERSION")
@@ -24,22 +42,192 @@ class AzureOpenAIClient:
             raise RuntimeError(f"Missing environment variables: {', '.join(missing)}")
 
         self.deployment = deployment
+        self.endpoint = endpoint
+        # Pool sized for every concurrent call plus hedges, so it never becomes a hidden queue
+        self.http_client, self.transport_stats, timeout = build_http_client(
+            concurrency=concurrency,
+            http2=http2,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            keepalive_expiry=keepalive_expiry,
+            headroom=hedge_budget if hedge_percentile is not None else 0.0,
+        )
         self.client = AsyncAzureOpenAI(
             api_key=api_key,
             azure_endpoint=endpoint,
             api_version=api_version,
+            http_client=self.http_client,
+            timeout=timeout,
         )
         self.max_tokens = max_tokens
 
-    async def chat_completion(self, system_prompt: str, user_payload: str) -> str:
-        response = await self.client.chat.completions.create(
-            model=self.deployment,
-            temperature=0.0,
-            top_p=1,
-            max_tokens=self.max_tokens,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_payload},
-            ],
+        # Hedging: once a call runs past the given percentile of recent
+        # latencies, fire a duplicate (optionally at another deployment) and
+        # keep whichever answers first. Disabled when hedge_percentile is None.
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_deployment = (
+            hedge_deployment
+            or os.environ.get("AZURE_CHAT_HEDGE_DEPLOYMENT")
+            or deployment
         )
-        return response.choices[0].message.content or ""
+        # Windows and budgets are kept per call kind: one-query correction calls
+        # are much faster than full batches and would drag the batch percentile down.
+        self._latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=hedge_window))
+        self._calls: Counter = Counter()
+        self._hedges_launched: Counter = Counter()
+        self._hedge_wins = 0
+        self._primary_wins = 0
+        self._hedges_skipped_budget = 0
+
+    async def _create(
+        self,
+        deployment: str,
+        system_prompt: str,
+        user_payload: str,
+        validator: Optional[Callable[[str], Any]] = None,
+        kind: Optional[str] = None,
+    ) -> str:
+        """One completion call; ``validator`` raises if the content is unusable.
+
+        ``kind`` is set for primary calls only; their latency feeds that kind's window.
+        """
+        start = time.monotonic()
+        try:
+            response = await self.client.chat.completions.create(
+                model=deployment,
+                temperature=0.0,
+                top_p=1,
+                max_tokens=self.max_tokens,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_payload},
+                ],
+            )
+        except asyncio.CancelledError:
+            # A primary that lost to its hedge still took at least this long;
+            # dropping it would bias the latency window (and the hedge delay) low.
+            if kind is not None:
+                self._latencies[kind].append(time.monotonic() - start)
+            raise
+        # Only primaries feed the window: hedges start late and would skew it
+        if kind is not None:
+            self._latencies[kind].append(time.monotonic() - start)
+        content = response.choices[0].message.content or ""
+        if not content.strip():
+            raise ValueError("Empty completion")
+        if validator is not None:
+            validator(content)
+        return content
+
+    def _hedge_delay(self, kind: str = "batch") -> Optional[float]:
+        """Latency threshold after which a hedge is sent, or None if not yet known."""
+        samples = self._latencies.get(kind, ())
+        if self.hedge_percentile is None or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100.0))
+        return ordered[idx]
+
+    def _hedge_allowed(self, kind: str) -> bool:
+        if self._hedges_launched[kind] + 1 <= self.hedge_budget * self._calls[kind]:
+            return True
+        self._hedges_skipped_budget += 1
+        return False
+
+    async def chat_completion(
+        self,
+        system_prompt: str,
+        user_payload: str,
+        validator: Optional[Callable[[str], Any]] = None,
+        kind: str = "batch",
+    ) -> str:
+        """Return the first completion that passes ``validator`` (non-empty if None).
+
+        ``kind`` groups calls of similar size ("batch", "correction"); each kind
+        has its own latency window and hedge budget.
+        """
+        self._calls[kind] += 1
+        delay = self._hedge_delay(kind)
+        if delay is None:
+            return await self._create(
+                self.deployment, system_prompt, user_payload, validator, kind
+            )
+
+        primary = asyncio.ensure_future(
+            self._create(self.deployment, system_prompt, user_payload, validator, kind)
+        )
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            # asyncio.wait does not cancel what it waits on; don't leave the call unowned
+            primary.cancel()
+            raise
+        if done or not self._hedge_allowed(kind):
+            return await primary
+
+        self._hedges_launched[kind] += 1
+        hedge = asyncio.ensure_future(
+            self._create(self.hedge_deployment, system_prompt, user_payload, validator)
+        )
+        pending = {primary, hedge}
+        last_exc: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        last_exc = task.exception()
+                        continue
+                    if task is hedge:
+                        self._hedge_wins += 1
+                    else:
+                        self._primary_wins += 1
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_exc
+
+    async def warm_up(self, connections: int) -> int:
+        """Open ``connections`` keep-alive connections (TCP + TLS) before the first batch."""
+        if connections <= 0:
+            return 0
+
+        async def touch() -> bool:
+            try:
+                # Any response, even a 404, leaves a pooled connection behind;
+                # untraced so warm-up doesn't show up as traffic in the stats
+                await self.http_client.head(self.endpoint, extensions={UNTRACED: True})
+                return True
+            except Exception:
+                return False
+
+        results = await asyncio.gather(*(touch() for _ in range(connections)))
+        return sum(results)
+
+    def get_transport_stats(self) -> Dict[str, Any]:
+        return self.transport_stats.snapshot()
+
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        launched = sum(self._hedges_launched.values())
+        return {
+            "calls": sum(self._calls.values()),
+            "hedges_launched": launched,
+            "hedge_wins": self._hedge_wins,
+            "primary_wins_after_hedge": self._primary_wins,
+            "hedges_skipped_budget": self._hedges_skipped_budget,
+            "hedge_win_rate": self._hedge_wins / launched if launched else 0.0,
+            "hedge_delay_s": self._hedge_delay(),
+            "by_kind": {
+                kind: {
+                    "calls": calls,
+                    "hedges_launched": self._hedges_launched[kind],
+                    "hedge_delay_s": self._hedge_delay(kind),
+                }
+                for kind, calls in self._calls.items()
+            },
+        }
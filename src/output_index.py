@@ -0,0 +1,124 @@
+import argparse
+import json
+import mmap
+import os
+import sys
+from typing import Any, Dict, Iterator, Optional
+
+from src.result_writer import INDEX_ENTRY, index_path_for, query_hash
+
+
+class OutputIndex:
+    """Random access into a templates_output.jsonl file by input ordinal.
+
+    Both the output file and its ``.idx`` sidecar are memory-mapped, so a
+    lookup is one 8-byte read plus one line read.
+    """
+
+    def __init__(self, output_path: str, index_path: Optional[str] = None):
+        self.output_path = output_path
+        self.index_path = index_path or index_path_for(output_path)
+        self._out_file = open(output_path, "rb")
+        self._idx_file = open(self.index_path, "rb")
+        self._out = self._map(self._out_file)
+        self._idx = self._map(self._idx_file)
+
+    @staticmethod
+    def _map(f: Any) -> Any:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        """Number of ordinal slots (the highest written ordinal + 1)."""
+        return len(self._idx) // INDEX_ENTRY.size
+
+    def offset(self, ordinal: int) -> Optional[int]:
+        if ordinal < 0 or ordinal >= len(self):
+            return None
+        (slot,) = INDEX_ENTRY.unpack_from(self._idx, ordinal * INDEX_ENTRY.size)
+        return slot - 1 if slot else None
+
+    def _read_at(self, offset: int) -> Dict[str, Any]:
+        end = self._out.find(b"\n", offset)
+        return json.loads(self._out[offset:end if end != -1 else len(self._out)])
+
+    def get(self, ordinal: int) -> Optional[Dict[str, Any]]:
+        offset = self.offset(ordinal)
+        return None if offset is None else self._read_at(offset)
+
+    def iter_ordered(self) -> Iterator[Dict[str, Any]]:
+        """Yield records in input order, regardless of the order batches finished in."""
+        for ordinal in range(len(self)):
+            offset = self.offset(ordinal)
+            if offset is not None:
+                yield self._read_at(offset)
+
+    def close(self) -> None:
+        for m in (self._out, self._idx):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._out_file.close()
+        self._idx_file.close()
+
+
+def rebuild_index(output_path: str, index_path: Optional[str] = None) -> int:
+    """Recreate the sidecar from the ``id`` fields already in the output file."""
+    index_path = index_path or index_path_for(output_path)
+    written = 0
+    with open(output_path, "rb") as src, open(index_path, "w+b") as idx:
+        offset = 0
+        for line in src:
+            try:
+                ordinal = json.loads(line).get("id")
+            except Exception:
+                ordinal = None
+            if isinstance(ordinal, int) and ordinal >= 0:
+                idx.seek(ordinal * INDEX_ENTRY.size)
+                idx.write(INDEX_ENTRY.pack(offset + 1))
+                written += 1
+            offset += len(line)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up or re-emit indexed template output")
+    parser.add_argument("--output", required=True, help="templates_output.jsonl written with ids")
+    sub = parser.add_subparsers(dest="command", required=True)
+    get = sub.add_parser("get", help="Print the record for an input ordinal")
+    get.add_argument("ordinal", type=int)
+    get.add_argument("--query", default=None, help="Also verify the record's hash against this query")
+    emit = sub.add_parser("reemit", help="Write all records in input order")
+    emit.add_argument("--to", default="-", help="Destination file (default: stdout)")
+    sub.add_parser("rebuild", help="Rebuild the .idx sidecar from the output file")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"✅ Indexed {rebuild_index(args.output)} records")
+        return
+
+    index = OutputIndex(args.output)
+    try:
+        if args.command == "get":
+            record = index.get(args.ordinal)
+            if record is None:
+                print(f"No record for ordinal {args.ordinal}", file=sys.stderr)
+                sys.exit(1)
+            if args.query is not None and record.get("hash") != query_hash(args.query):
+                print("Hash mismatch: record does not belong to that query", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(record, ensure_ascii=False))
+        else:
+            out = sys.stdout if args.to == "-" else open(args.to, "w", encoding="utf-8")
+            try:
+                for record in index.iter_ordered():
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
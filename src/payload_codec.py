@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.entity_value_registry import EntityValueRegistry
+
+
+PAYLOAD_FORMATS = ("json", "compact")
+VALUE_DELIM = "|"
+
+# Appended to the system prompt when payloads are sent in the compact format.
+COMPACT_PROMPT_SECTION = """
+====================================================
+COMPACT INPUT FORMAT
+====================================================
+
+The input uses a compact encoding instead of entity_labels /
+entity_values_reference:
+
+{
+  "queries": ["query1", "query2", ...],
+  "labels": {"SN": "SOURCE_NAME", "DN": "DESTINATION_NAME", ...},
+  "values": {"SN": "bangalore|blr|mumbai|...", ...}
+}
+
+- "labels" maps a short code to each entity label. It replaces entity_labels.
+- "values" holds the known entity values for each code, lowercased and
+  separated by "|". It replaces entity_values_reference; every rule that
+  mentions entity_values_reference applies to these values.
+- Matching is case-insensitive: "blr" also covers "BLR" and "Blr".
+
+The OUTPUT format is unchanged. Always write full label names, never codes:
+templates use {SOURCE_NAME} (not {SN}) and new_entity_values keys are full
+label names.
+"""
+
+_PLACEHOLDER_RE = re.compile(r"\{([A-Z0-9_]+)\}")
+
+
+def label_codes(labels: List[str]) -> Dict[str, str]:
+    """Short, deterministic code per label: word initials, numbered on collision."""
+    codes: Dict[str, str] = {}
+    taken = set(labels)
+    for label in labels:
+        base = "".join(part[0] for part in label.split("_") if part) or label[:1]
+        code = base
+        n = 2
+        while code in taken:
+            code = f"{base}{n}"
+            n += 1
+        taken.add(code)
+        codes[label] = code
+    return codes
+
+
+def codes_for(labels: List[str], reference_values: Dict[str, List[str]]) -> Dict[str, str]:
+    """Code table for ``labels`` plus any extra labels that only appear in the registry."""
+    extra = [label for label in reference_values if label not in labels]
+    return label_codes(list(labels) + extra)
+
+
+def compact_values(values: List[str]) -> str:
+    """Case-folded dedup of one label's values, joined with VALUE_DELIM."""
+    seen = set()
+    out: List[str] = []
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        text = " ".join(value.replace(VALUE_DELIM, " ").split()).lower()
+        key = text.casefold()
+        if not text or key in seen:
+            continue
+        seen.add(key)
+        out.append(text)
+    return VALUE_DELIM.join(out)
+
+
+def encode_payload(
+    queries: List[str],
+    labels: List[str],
+    reference_values: Dict[str, List[str]],
+    fmt: str = "json",
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Serialize a batch (or correction) payload in the requested format."""
+    if fmt not in PAYLOAD_FORMATS:
+        raise ValueError(f"Unknown payload format {fmt!r}; expected one of {PAYLOAD_FORMATS}")
+    payload: Dict[str, Any] = {"queries": queries}
+    if extra:
+        payload.update(extra)
+    if fmt == "json":
+        payload["entity_labels"] = labels
+        payload["entity_values_reference"] = reference_values
+    else:
+        codes = codes_for(labels, reference_values)
+        payload["labels"] = {code: label for label, code in codes.items()}
+        values = {}
+        for label, code in codes.items():
+            joined = compact_values(reference_values.get(label, []))
+            if joined:
+                values[code] = joined
+        payload["values"] = values
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    # The json format stays byte-identical to what was sent before
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def decode_payload(payload_str: str) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+    """Inverse of encode_payload for either format: (queries, labels, reference_values)."""
+    payload = json.loads(payload_str)
+    queries = payload.get("queries", [])
+    if "entity_values_reference" in payload:
+        return queries, payload.get("entity_labels", []), payload["entity_values_reference"]
+    table = payload.get("labels", {})
+    reference = {
+        table[code]: joined.split(VALUE_DELIM)
+        for code, joined in payload.get("values", {}).items()
+        if code in table and joined
+    }
+    return queries, list(table.values()), reference
+
+
+def decode_results(results: List[Any], codes: Dict[str, str]) -> List[Any]:
+    """Map any label codes the model echoed back to full label names, in place."""
+    by_code = {code: label for label, code in codes.items() if code != label}
+    if not by_code:
+        return results
+
+    def expand(match: "re.Match") -> str:
+        return "{" + by_code.get(match.group(1), match.group(1)) + "}"
+
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        template = result.get("template")
+        if isinstance(template, str):
+            result["template"] = _PLACEHOLDER_RE.sub(expand, template)
+        new_values = result.get("new_entity_values")
+        if isinstance(new_values, dict):
+            result["new_entity_values"] = {
+                by_code.get(key, key): value for key, value in new_values.items()
+            }
+    return results
+
+
+# ----------------------------------------------------------------------
+# Format comparison
+# ----------------------------------------------------------------------
+
+
+def _sample_batches(input_path: str, batch_size: int, batches: int) -> List[List[str]]:
+    from src.batch_processor import read_jsonl_lines
+
+    out: List[List[str]] = []
+    batch: List[str] = []
+    for line in read_jsonl_lines(input_path, 0):
+        try:
+            query = json.loads(line)
+        except Exception:
+            continue
+        if not isinstance(query, str):
+            continue
+        batch.append(query)
+        if len(batch) >= batch_size:
+            out.append(batch)
+            batch = []
+            if len(out) >= batches:
+                break
+    if batch and len(out) < batches:
+        out.append(batch)
+    return out
+
+
+def compare_tokens(
+    system_prompt: str,
+    labels: List[str],
+    reference_values: Dict[str, List[str]],
+    batches: List[List[str]],
+) -> Tuple[Dict[str, Dict[str, float]], str]:
+    """Average prompt tokens per call for each format over the sample batches."""
+    from src.planner import load_tokenizer
+
+    count_tokens, tokenizer_name = load_tokenizer()
+    report: Dict[str, Dict[str, float]] = {}
+    for fmt in PAYLOAD_FORMATS:
+        prompt = system_prompt + (COMPACT_PROMPT_SECTION if fmt == "compact" else "")
+        system_tokens = count_tokens(prompt)
+        reference_tokens = count_tokens(encode_payload([], labels, reference_values, fmt))
+        payload_tokens = [
+            count_tokens(encode_payload(b, labels, reference_values, fmt)) for b in batches
+        ]
+        avg_payload = sum(payload_tokens) / len(payload_tokens) if payload_tokens else 0.0
+        report[fmt] = {
+            "system_tokens": system_tokens,
+            "reference_tokens": reference_tokens,
+            "payload_tokens": avg_payload,
+            "prompt_tokens_per_call": system_tokens + avg_payload,
+        }
+    return report, tokenizer_name
+
+
+def check_round_trip(labels: List[str], reference_values: Dict[str, List[str]]) -> List[str]:
+    """Labels whose values do not survive compact encode/decode (case-insensitively)."""
+    _, decoded_labels, decoded = decode_payload(
+        encode_payload([], labels, reference_values, "compact")
+    )
+    lost = []
+    for label, values in reference_values.items():
+        want = {" ".join(v.replace(VALUE_DELIM, " ").split()).casefold() for v in values}
+        want.discard("")
+        got = {v.casefold() for v in decoded.get(label, [])}
+        if want != got or label not in decoded_labels:
+            lost.append(label)
+    return lost
+
+
+async def compare_outputs(
+    system_prompt: str,
+    labels: List[str],
+    reference_values: Dict[str, List[str]],
+    batches: List[List[str]],
+    max_tokens: int = 2048,
+) -> Dict[str, Any]:
+    """Send each sample batch in both formats and compare first-pass results."""
+    from src.batch_processor import BatchProcessor
+    from src.openai_client import AzureOpenAIClient
+
+    client = AzureOpenAIClient(max_tokens=max_tokens, concurrency=len(batches) * 2)
+    codes = codes_for(labels, reference_values)
+    prompts = {"json": system_prompt, "compact": system_prompt + COMPACT_PROMPT_SECTION}
+
+    async def run(fmt: str, batch: List[str]) -> Optional[List[Dict[str, Any]]]:
+        payload = encode_payload(batch, labels, reference_values, fmt)
+        try:
+            raw = await client.chat_completion(prompts[fmt], payload)
+            results = json.loads(BatchProcessor._sanitize_llm_output(raw))
+        except Exception:
+            return None
+        if not isinstance(results, list) or len(results) != len(batch):
+            return None
+        return decode_results(results, codes) if fmt == "compact" else results
+
+    stats: Dict[str, Any] = {
+        "queries": 0,
+        "failed_batches": {fmt: 0 for fmt in PAYLOAD_FORMATS},
+        "leaks": {fmt: 0 for fmt in PAYLOAD_FORMATS},
+        "ignore_agree": 0,
+        "template_exact": 0,
+        "both_templated": 0,
+    }
+    pairs = await asyncio.gather(
+        *(asyncio.gather(run("json", b), run("compact", b)) for b in batches)
+    )
+    for batch, (base, compact) in zip(batches, pairs):
+        for fmt, results in (("json", base), ("compact", compact)):
+            if results is None:
+                stats["failed_batches"][fmt] += 1
+                continue
+            for result in results:
+                if isinstance(result, dict) and result.get("ignore") is False:
+                    stats["leaks"][fmt] += len(
+                        BatchProcessor._find_leaked_entities(
+                            result.get("template", ""), reference_values
+                        )
+                    )
+        if base is None or compact is None:
+            continue
+        for a, b in zip(base, compact):
+            if not isinstance(a, dict) or not isinstance(b, dict):
+                continue
+            stats["queries"] += 1
+            if a.get("ignore") == b.get("ignore"):
+                stats["ignore_agree"] += 1
+            if a.get("ignore") is False and b.get("ignore") is False:
+                stats["both_templated"] += 1
+                if a.get("template", "").strip() == b.get("template", "").strip():
+                    stats["template_exact"] += 1
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the json and compact payload formats")
+    parser.add_argument("--input", required=True, help="Input JSONL file of queries")
+    parser.add_argument("--registry", required=True, help="Entity value registry JSON")
+    parser.add_argument("--system-prompt", required=True, help="System prompt text file")
+    parser.add_argument("--registry-cap", type=int, default=None, help="Same as main.py --registry-cap")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--batches", type=int, default=20, help="Number of sample batches")
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Also send every sample batch in both formats and compare the results",
+    )
+    args = parser.parse_args()
+
+    with open(args.system_prompt, "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    registry = EntityValueRegistry(
+        args.registry, max_values_per_label=args.registry_cap, read_only=True
+    )
+    labels = registry.get_entity_labels()
+    reference = registry.get_reference_values()
+    batches = _sample_batches(args.input, args.batch_size, args.batches)
+    if not batches:
+        print("No queries found in input")
+        return
+
+    report, tokenizer_name = compare_tokens(system_prompt, labels, reference, batches)
+    base, compact = report["json"], report["compact"]
+    print(f"Token comparison over {len(batches)} batches ({tokenizer_name})")
+    print(f"{'':<26}{'json':>12}{'compact':>12}{'saved':>10}")
+    for key, title in (
+        ("system_tokens", "system prompt"),
+        ("reference_tokens", "labels + values"),
+        ("payload_tokens", "user payload (avg)"),
+        ("prompt_tokens_per_call", "prompt tokens / call"),
+    ):
+        saved = 1 - compact[key] / base[key] if base[key] else 0.0
+        print(f"{title:<26}{base[key]:>12,.0f}{compact[key]:>12,.0f}{saved:>9.1%}")
+
+    lost = check_round_trip(labels, reference)
+    print(
+        "Round trip: all values preserved (case-insensitive)"
+        if not lost else f"Round trip: values changed for {', '.join(lost)}"
+    )
+
+    if args.live:
+        stats = asyncio.run(compare_outputs(system_prompt, labels, reference, batches))
+        n = stats["queries"] or 1
+        both = stats["both_templated"] or 1
+        print(f"Live comparison over {stats['queries']} queries")
+        print(f"  ignore decision agreement: {stats['ignore_agree'] / n:.1%}")
+        print(f"  identical templates:       {stats['template_exact'] / both:.1%}")
+        print(f"  leaked entities:           json {stats['leaks']['json']}, compact {stats['leaks']['compact']}")
+        print(
+            f"  failed batches:            json {stats['failed_batches']['json']}, "
+            f"compact {stats['failed_batches']['compact']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.batch_processor import read_jsonl_records, resume_point
+from src.entity_value_registry import EntityValueRegistry
+from src.ignore_classifier import IgnoreClassifier
+from src.payload_codec import COMPACT_PROMPT_SECTION, encode_payload
+
+
+# Per-query JSON the model emits around the template: {"ignore": false, "template": "...", ...}
+COMPLETION_OVERHEAD_TOKENS = 20
+# Completion tokens for an {"ignore": true} entry
+IGNORE_COMPLETION_TOKENS = 6
+BATCH_SIZE_CANDIDATES = (5, 10, 15, 20, 25, 30, 40, 50)
+MODEL_MAX_COMPLETION_TOKENS = 4096
+
+
+def load_tokenizer() -> Tuple[Callable[[str], int], str]:
+    """Return (count_tokens, name); falls back to a chars/4 estimate without tiktoken."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: max(1, math.ceil(len(text) / 4))), "chars/4 estimate"
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            enc = tiktoken.get_encoding(name)
+        except Exception:
+            continue
+        return (lambda text: len(enc.encode(text))), f"tiktoken:{name}"
+    return (lambda text: max(1, math.ceil(len(text) / 4))), "chars/4 estimate"
+
+
+class RunPlanner:
+    """Dry run of BatchProcessor.run(): predicts calls, tokens, retries and wall time.
+
+    Nothing is sent to Azure and the registry is opened read-only. The input
+    is streamed through the same batching as a real run, and the prompt is
+    tokenized exactly as it would be sent. Like run(), up to ``concurrency``
+    batches are assumed to be in flight at once.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        registry_path: str,
+        system_prompt: str,
+        batch_size: int,
+        concurrency: int,
+        max_tokens: int,
+        reset: bool = False,
+        registry_cap_per_label: Optional[int] = None,
+        ignore_model_path: Optional[str] = None,
+        ignore_precision: float = 0.98,
+        tpm: Optional[int] = None,
+        rpm: Optional[int] = None,
+        retry_rate: float = 0.03,
+        correction_rate: float = 0.05,
+        ignore_rate: float = 0.3,
+        base_latency: float = 1.5,
+        decode_tps: float = 60.0,
+        payload_format: str = "json",
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.system_prompt = system_prompt
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+        self.reset = reset
+        self.tpm = tpm
+        self.rpm = rpm
+        self.retry_rate = retry_rate
+        self.correction_rate = correction_rate
+        self.ignore_rate = ignore_rate
+        self.base_latency = base_latency
+        self.decode_tps = decode_tps
+        self.count_tokens, self.tokenizer_name = load_tokenizer()
+
+        registry = EntityValueRegistry(
+            registry_path, max_values_per_label=registry_cap_per_label, read_only=True
+        )
+        reference = registry.get_reference_values()
+        labels = registry.get_entity_labels()
+        if payload_format == "compact":
+            system_prompt = system_prompt + COMPACT_PROMPT_SECTION
+        self.system_tokens = self.count_tokens(system_prompt)
+        # Everything in the payload except the queries themselves
+        skeleton = encode_payload([], labels, reference, payload_format)
+        self.reference_tokens = self.count_tokens(skeleton)
+        self.fixed_prompt_tokens = self.system_tokens + self.count_tokens(skeleton)
+
+        self.ignore_classifier: Optional[IgnoreClassifier] = None
+        self.ignore_threshold: Optional[float] = None
+        if ignore_model_path:
+            self.ignore_classifier = IgnoreClassifier.load(ignore_model_path)
+            self.ignore_threshold = self.ignore_classifier.threshold_for_precision(ignore_precision)
+
+    # ------------------------------------------------------------------
+    # Input scan
+    # ------------------------------------------------------------------
+
+    def _scan(self) -> List[int]:
+        """Stream the input once; returns the token count of each query that would reach the LLM."""
+        skip, done = (0, set()) if self.reset else resume_point(self.output_path)
+        self.skipped = skip + len(done)
+        self.local_ignores = 0
+        per_query: List[int] = []
+        for ordinal, line in read_jsonl_records(self.input_path, skip):
+            if ordinal in done:
+                continue
+            try:
+                query = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(query, str):
+                continue
+            if (
+                self.ignore_threshold is not None
+                and self.ignore_classifier.predict_proba(query) >= self.ignore_threshold
+            ):
+                self.local_ignores += 1
+                continue
+            # +1 for the separating comma in the JSON array
+            per_query.append(self.count_tokens(json.dumps(query, ensure_ascii=False)) + 1)
+        return per_query
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+
+    def _completion_tokens(self, query_tokens: int) -> float:
+        """Expected completion tokens for one query, mixing templated and ignored answers."""
+        templated = query_tokens * 1.2 + COMPLETION_OVERHEAD_TOKENS
+        return (1 - self.ignore_rate) * templated + self.ignore_rate * IGNORE_COMPLETION_TOKENS
+
+    def estimate(
+        self,
+        per_query: List[int],
+        batch_size: int,
+        concurrency: int,
+        max_tokens: int,
+    ) -> Dict[str, Any]:
+        calls = 0
+        prompt_tokens = 0.0
+        completion_tokens = 0.0
+        truncated_batches = 0
+        for start in range(0, len(per_query), batch_size):
+            batch = per_query[start:start + batch_size]
+            calls += 1
+            prompt_tokens += self.fixed_prompt_tokens + sum(batch)
+            expected = sum(self._completion_tokens(t) for t in batch)
+            if expected > max_tokens:
+                # Truncated JSON fails to parse: 3 attempts, then the batch is written as ignored
+                truncated_batches += 1
+                completion_tokens += 3 * max_tokens
+                prompt_tokens += 2 * (self.fixed_prompt_tokens + sum(batch))
+                calls += 2
+            else:
+                completion_tokens += expected
+
+        templated = len(per_query) * (1 - self.ignore_rate)
+        retries = calls * self.retry_rate
+        corrections = templated * self.correction_rate
+        avg_prompt = prompt_tokens / calls if calls else 0.0
+        avg_completion = completion_tokens / calls if calls else 0.0
+        # Correction payloads carry one query plus the full reference
+        correction_prompt = self.fixed_prompt_tokens + 80
+        total_calls = calls + retries + corrections
+        total_prompt = prompt_tokens + retries * avg_prompt + corrections * correction_prompt
+        total_completion = completion_tokens + retries * avg_completion + corrections * 60
+
+        latency = self.base_latency + avg_completion / self.decode_tps
+        limits = {"concurrency": concurrency / latency if latency else math.inf}
+        if self.rpm:
+            limits["rpm"] = self.rpm / 60.0
+        if self.tpm and total_calls:
+            tokens_per_call = (total_prompt + total_completion) / total_calls
+            limits["tpm"] = self.tpm / 60.0 / tokens_per_call
+        bottleneck = min(limits, key=limits.get)
+        calls_per_sec = limits[bottleneck]
+        wall = total_calls / calls_per_sec if calls_per_sec else math.inf
+
+        return {
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "max_tokens": max_tokens,
+            "llm_queries": len(per_query),
+            "calls": calls,
+            "expected_retries": round(retries + 2 * truncated_batches),
+            "expected_corrections": round(corrections),
+            "truncated_batches": truncated_batches,
+            "prompt_tokens": int(total_prompt),
+            "completion_tokens": int(total_completion),
+            "avg_latency_s": latency,
+            "bottleneck": bottleneck,
+            "calls_per_sec": calls_per_sec,
+            "wall_time_s": wall,
+            "queries_per_sec": len(per_query) / wall if wall else 0.0,
+        }
+
+    def _recommend(self, per_query: List[int]) -> Dict[str, Any]:
+        best: Optional[Dict[str, Any]] = None
+        avg_completion = (
+            sum(self._completion_tokens(t) for t in per_query) / len(per_query)
+            if per_query else 0.0
+        )
+        for batch_size in BATCH_SIZE_CANDIDATES:
+            # 1.5x headroom over the expected completion, rounded up to 256
+            max_tokens = int(math.ceil(avg_completion * batch_size * 1.5 / 256.0) * 256)
+            if max_tokens > MODEL_MAX_COMPLETION_TOKENS:
+                continue
+            max_tokens = max(max_tokens, 256)
+            plan = self.estimate(per_query, batch_size, self.concurrency, max_tokens)
+            if plan["bottleneck"] != "concurrency":
+                # Lowest concurrency that still saturates the quota
+                needed = math.ceil(plan["calls_per_sec"] * plan["avg_latency_s"])
+                plan = self.estimate(per_query, batch_size, max(1, needed), max_tokens)
+            if best is None or plan["wall_time_s"] < best["wall_time_s"] * 0.98:
+                best = plan
+        return best or {}
+
+    def plan(self) -> Dict[str, Any]:
+        per_query = self._scan()
+        return {
+            "tokenizer": self.tokenizer_name,
+            "skipped_already_done": self.skipped,
+            "local_ignores": self.local_ignores,
+            "system_prompt_tokens": self.system_tokens,
+            "reference_tokens": self.reference_tokens,
+            "fixed_prompt_tokens_per_call": self.fixed_prompt_tokens,
+            "configured": self.estimate(per_query, self.batch_size, self.concurrency, self.max_tokens),
+            "recommended": self._recommend(per_query),
+        }
+
+
+def print_plan(plan: Dict[str, Any]) -> None:
+    print(f"🧮 Tokenizer: {plan['tokenizer']}")
+    print(
+        f"   Skipped (already done): {plan['skipped_already_done']:,}   "
+        f"Local ignores: {plan['local_ignores']:,}"
+    )
+    print(
+        f"   Fixed prompt per call: {plan['fixed_prompt_tokens_per_call']:,} tokens "
+        f"(system {plan['system_prompt_tokens']:,}, reference {plan['reference_tokens']:,})"
+    )
+    rows = [
+        ("batch_size", "{:,}"), ("concurrency", "{:,}"), ("max_tokens", "{:,}"),
+        ("llm_queries", "{:,}"), ("calls", "{:,}"), ("expected_retries", "{:,}"),
+        ("expected_corrections", "{:,}"), ("truncated_batches", "{:,}"),
+        ("prompt_tokens", "{:,}"), ("completion_tokens", "{:,}"),
+        ("avg_latency_s", "{:.2f}"), ("bottleneck", "{}"),
+        ("wall_time_s", "{:,.0f}"), ("queries_per_sec", "{:.2f}"),
+    ]
+    configured, recommended = plan["configured"], plan["recommended"]
+    print(f"\n{'':<22}{'configured':>16}{'recommended':>16}")
+    for key, fmt in rows:
+        left = fmt.format(configured[key]) if key in configured else "-"
+        right = fmt.format(recommended[key]) if key in recommended else "-"
+        print(f"{key:<22}{left:>16}{right:>16}")
+    if configured.get("truncated_batches"):
+        print(
+            f"\n⚠️  {configured['truncated_batches']:,} batches are expected to exceed "
+            f"--max-tokens and would be written as ignored"
+        )
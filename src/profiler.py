@@ -0,0 +1,164 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+STAGES = (
+    "read", "parse_input", "batch_build", "encode", "llm_wait", "parse",
+    "validate", "correct", "registry_update", "write",
+)
+
+_NULL = nullcontext()
+
+
+class StageProfiler:
+    """Stage timers plus a sampling thread for the asyncio pipeline.
+
+    Synchronous stages (``stage``) record wall and CPU time and mark the event
+    loop thread as "in" that stage, so stack samples taken meanwhile are
+    attributed to it. Awaited stages (``wait``) overlap across tasks and only
+    record wall time. When disabled, both return a shared no-op context.
+    """
+
+    def __init__(self, enabled: bool = False, interval: float = 0.005):
+        self.enabled = enabled
+        self.interval = interval
+        self._wall: Dict[str, float] = defaultdict(float)
+        self._cpu: Dict[str, float] = defaultdict(float)
+        self._calls: Counter = Counter()
+        self._samples: Counter = Counter()
+        self._current: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._target_ident: Optional[int] = None
+        self._stop = threading.Event()
+        self._started_at = 0.0
+        self._elapsed = 0.0
+
+    # ------------------------------------------------------------------
+    # Stage timers
+    # ------------------------------------------------------------------
+
+    def stage(self, name: str) -> Any:
+        if not self.enabled:
+            return _NULL
+        return self._sync_stage(name)
+
+    def wait(self, name: str) -> Any:
+        if not self.enabled:
+            return _NULL
+        return self._wait_stage(name)
+
+    @contextmanager
+    def _sync_stage(self, name: str) -> Iterator[None]:
+        previous = self._current
+        self._current = name
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self._wall[name] += time.perf_counter() - wall0
+            self._cpu[name] += time.thread_time() - cpu0
+            self._calls[name] += 1
+            self._current = previous
+
+    @contextmanager
+    def _wait_stage(self, name: str) -> Iterator[None]:
+        wall0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._wall[name] += time.perf_counter() - wall0
+            self._calls[name] += 1
+
+    def iter_stage(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Attribute the time spent producing each item of ``iterable`` to ``name``."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self._sync_stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    # ------------------------------------------------------------------
+    # Sampler
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _frame_label(frame: Any) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_ident)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples[";".join([self._current or "(event loop)"] + stack)] += 1
+
+    def start(self) -> None:
+        """Start sampling the calling thread (the one that will run the event loop)."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._target_ident = threading.get_ident()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="stage-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._elapsed = time.perf_counter() - self._started_at
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+
+    def summary(self) -> str:
+        total = self._elapsed or 1e-9
+        lines = [
+            f"{'stage':<18}{'calls':>10}{'wall s':>12}{'avg ms':>10}{'cpu s':>10}{'% run':>8}",
+        ]
+        names = [s for s in STAGES if s in self._calls] + sorted(
+            s for s in self._calls if s not in STAGES
+        )
+        for name in names:
+            calls = self._calls[name]
+            wall = self._wall[name]
+            cpu = f"{self._cpu[name]:.2f}" if name in self._cpu else "-"
+            lines.append(
+                f"{name:<18}{calls:>10,}{wall:>12.2f}{wall / calls * 1000:>10.2f}"
+                f"{cpu:>10}{wall / total * 100:>7.1f}%"
+            )
+        lines.append(f"run wall time: {self._elapsed:.2f}s, {sum(self._samples.values()):,} samples")
+        lines.append("(llm_wait/correct overlap across concurrent batches, so they can exceed 100%)")
+        return "\n".join(lines)
+
+    def write(self, prefix: str) -> List[str]:
+        """Write ``<prefix>.collapsed`` (flamegraph.pl / speedscope) and ``<prefix>_stages.txt``."""
+        self.stop()
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        collapsed = prefix + ".collapsed"
+        with open(collapsed, "w", encoding="utf-8") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        stages = prefix + "_stages.txt"
+        with open(stages, "w", encoding="utf-8") as f:
+            f.write(self.summary() + "\n")
+        return [collapsed, stages]
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import shutil
+import signal
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.batch_processor import BatchProcessor
+from utils.logger import Logger
+
+
+SPOOL_SUFFIXES = (".json", ".jsonl")
+# Bytes read from the tailed file per step, so a large backlog never sits in memory
+TAIL_READ_BLOCK = 1 << 20
+
+
+def _parse_query(line: str) -> Optional[str]:
+    try:
+        query = json.loads(line)
+    except Exception:
+        return None
+    return query if isinstance(query, str) else None
+
+
+class _CheckpointTracker:
+    """Commits checkpoint states strictly in batch order, even when batches finish out of order."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._next_seq = 0
+        self._commit_seq = 0
+        self._completed: Dict[int, Tuple[Optional[Dict[str, Any]], Optional[Callable[[], None]]]] = {}
+
+    def load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def reserve(self) -> int:
+        seq = self._next_seq
+        self._next_seq += 1
+        return seq
+
+    def complete(
+        self,
+        seq: int,
+        state: Optional[Dict[str, Any]],
+        action: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._completed[seq] = (state, action)
+        latest: Optional[Dict[str, Any]] = None
+        while self._commit_seq in self._completed:
+            state, action = self._completed.pop(self._commit_seq)
+            self._commit_seq += 1
+            if action is not None:
+                # Persist everything before the action, run it, then record its state
+                if latest is not None:
+                    self._write(latest)
+                    latest = None
+                action()
+            if state is not None:
+                latest = state
+        if latest is not None:
+            self._write(latest)
+
+    def _write(self, state: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+class _FileDone:
+    def __init__(self, path: str):
+        self.path = path
+
+
+class QueryDaemon:
+    """Long-running mode: micro-batches queries from a tailed JSONL file or a spool directory.
+
+    The BatchProcessor (Azure client, registry, writer) stays warm across batches.
+    Progress is checkpointed after every batch so a restart resumes where it stopped.
+
+    Tailed queries are written with their line number in the tailed file as
+    ``id``, the same ordinal a batch run over that file would use. Spool
+    queries come from many files with no single ordinal, so they have no ``id``.
+    """
+
+    def __init__(
+        self,
+        processor: BatchProcessor,
+        checkpoint_path: str,
+        tail_path: Optional[str] = None,
+        spool_dir: Optional[str] = None,
+        max_wait: float = 2.0,
+        poll_interval: float = 1.0,
+        flush_interval: float = 30.0,
+    ):
+        if bool(tail_path) == bool(spool_dir):
+            raise ValueError("Exactly one of tail_path or spool_dir must be set")
+        self.processor = processor
+        self.tail_path = tail_path
+        self.spool_dir = spool_dir
+        self.batch_size = processor.batch_size
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.flush_interval = flush_interval
+        self.logger = Logger()
+        self._tracker = _CheckpointTracker(checkpoint_path)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 4)
+        self._slots = asyncio.Semaphore(processor.concurrency)
+        self._tasks: set = set()
+        self._stopping = asyncio.Event()
+        self._processed = 0
+        self._queued_files: set = set()
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    def _lines_before(self, offset: int) -> int:
+        """Line number at ``offset``, for checkpoints written before they stored it."""
+        lines = 0
+        with open(self.tail_path, "rb") as f:
+            while offset > 0:
+                block = f.read(min(TAIL_READ_BLOCK, offset))
+                if not block:
+                    break
+                lines += block.count(b"\n")
+                offset -= len(block)
+        return lines
+
+    async def _tail_source(self, checkpoint: Dict[str, Any]) -> None:
+        resuming = checkpoint.get("tail") == self.tail_path
+        offset = checkpoint.get("offset", 0) if resuming else 0
+        line = checkpoint.get("line") if resuming else 0
+        if line is None:
+            line = self._lines_before(offset) if os.path.exists(self.tail_path) else 0
+        partial = b""
+        while not self._stopping.is_set():
+            if not os.path.exists(self.tail_path):
+                await self._sleep(self.poll_interval)
+                continue
+            if os.path.getsize(self.tail_path) < offset:
+                self.logger.info(f"{self.tail_path} was truncated; restarting from the top")
+                offset, line, partial = 0, 0, b""
+            with open(self.tail_path, "rb") as f:
+                f.seek(offset + len(partial))
+                chunk = f.read(TAIL_READ_BLOCK)
+            if not chunk:
+                await self._sleep(self.poll_interval)
+                continue
+            data = partial + chunk
+            # Only consume complete lines; a half-written line waits for the next poll
+            end = data.rfind(b"\n") + 1
+            partial = data[end:]
+            pos = offset
+            for raw in data[:end].splitlines(keepends=True):
+                if self._stopping.is_set():
+                    break
+                pos += len(raw)
+                line += 1
+                query = _parse_query(raw.decode("utf-8", errors="replace").strip())
+                if query is not None:
+                    state = {"tail": self.tail_path, "offset": pos, "line": line}
+                    await self._queue.put((query, state, line - 1))
+            offset = pos
+
+    def _spool_files(self) -> List[str]:
+        now = time.time()
+        files = []
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if name.startswith(".") or not name.endswith(SPOOL_SUFFIXES) or not os.path.isfile(path):
+                continue
+            # Skip files that may still be being written
+            if now - os.path.getmtime(path) < self.poll_interval:
+                continue
+            files.append(path)
+        return sorted(files, key=lambda p: (os.path.getmtime(p), p))
+
+    @staticmethod
+    def _iter_spool_file(path: str) -> Iterator[Tuple[int, str]]:
+        with open(path, "r", encoding="utf-8") as f:
+            head = f.read(1)
+            while head and head.isspace():
+                head = f.read(1)
+            f.seek(0)
+            if head == "[":
+                data = json.load(f)
+                for i, item in enumerate(data if isinstance(data, list) else []):
+                    if isinstance(item, str):
+                        yield i, item
+                return
+            for i, line in enumerate(f):
+                query = _parse_query(line.strip()) if line.strip() else None
+                if query is not None:
+                    yield i, query
+
+    async def _spool_source(self, checkpoint: Dict[str, Any]) -> None:
+        done_dir = os.path.join(self.spool_dir, "done")
+        os.makedirs(done_dir, exist_ok=True)
+        resume_file = checkpoint.get("file")
+        resume_index = checkpoint.get("index", 0)
+        while not self._stopping.is_set():
+            files = [p for p in self._spool_files() if p not in self._queued_files]
+            if not files:
+                await self._sleep(self.poll_interval)
+                continue
+            for path in files:
+                if self._stopping.is_set():
+                    return
+                name = os.path.basename(path)
+                skip = resume_index if name == resume_file else 0
+                for index, query in self._iter_spool_file(path):
+                    if index < skip:
+                        continue
+                    await self._queue.put((query, {"file": name, "index": index + 1}, None))
+                    if self._stopping.is_set():
+                        return
+                self._queued_files.add(path)
+                await self._queue.put(_FileDone(path))
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Batching & dispatch
+    # ------------------------------------------------------------------
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[str] = []
+        ordinals: List[Optional[int]] = []
+        state: Optional[Dict[str, Any]] = None
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if batch else self.poll_interval
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if batch:
+                    await self._dispatch(batch, ordinals, state)
+                    batch, ordinals, state = [], [], None
+                elif self._stopping.is_set() and self._queue.empty():
+                    return
+                continue
+
+            if isinstance(item, _FileDone):
+                if batch:
+                    await self._dispatch(batch, ordinals, state)
+                    batch, ordinals, state = [], [], None
+                self._tracker.complete(
+                    self._tracker.reserve(),
+                    {"file": None, "index": 0},
+                    self._archive_action(item.path),
+                )
+                continue
+
+            query, state, ordinal = item
+            if not batch:
+                deadline = loop.time() + self.max_wait
+            batch.append(query)
+            ordinals.append(ordinal)
+            if len(batch) >= self.batch_size:
+                await self._dispatch(batch, ordinals, state)
+                batch, ordinals, state = [], [], None
+
+    def _archive_action(self, path: str) -> Callable[[], None]:
+        def action() -> None:
+            done_dir = os.path.join(self.spool_dir, "done")
+            shutil.move(path, os.path.join(done_dir, os.path.basename(path)))
+            self._queued_files.discard(path)
+            self.logger.info(f"Finished spool file {os.path.basename(path)}")
+        return action
+
+    async def _dispatch(
+        self,
+        batch: List[str],
+        ordinals: List[Optional[int]],
+        state: Optional[Dict[str, Any]],
+    ) -> None:
+        await self._slots.acquire()
+        seq = self._tracker.reserve()
+        task = asyncio.create_task(self._run_batch(seq, list(batch), list(ordinals), state))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(
+        self,
+        seq: int,
+        batch: List[str],
+        ordinals: List[Optional[int]],
+        state: Optional[Dict[str, Any]],
+    ) -> None:
+        try:
+            await self.processor.process_queries(batch, ordinals)
+        except Exception as exc:
+            self.logger.error(f"Batch of {len(batch)} queries failed: {exc}")
+            # Leave the checkpoint behind this batch so a restart retries it
+            self._stopping.set()
+            return
+        finally:
+            self._slots.release()
+        self._processed += len(batch)
+        self._tracker.complete(seq, state)
+
+    async def _periodic_flush(self) -> None:
+        reported = 0
+        while not self._stopping.is_set():
+            await self._sleep(self.flush_interval)
+            self.processor.flush()
+            if self._processed != reported:
+                reported = self._processed
+                self.logger.info(f"✓ Processed {reported} queries so far")
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        await self.processor.warm_up()
+        checkpoint = self._tracker.load()
+        if self.tail_path:
+            source = self._tail_source(checkpoint)
+            self.logger.info(f"Tailing {self.tail_path} (max_wait={self.max_wait}s)")
+        else:
+            source = self._spool_source(checkpoint)
+            self.logger.info(f"Watching spool directory {self.spool_dir} (max_wait={self.max_wait}s)")
+
+        source_task = asyncio.create_task(source)
+        flusher_task = asyncio.create_task(self._periodic_flush())
+        await self._batcher()
+        await source_task
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        flusher_task.cancel()
+        self.processor.flush()
+        self.processor.log_transport_stats()
+        self.logger.info(f"✅ Daemon stopped after {self._processed} queries")
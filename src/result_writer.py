@@ -1,15 +1,138 @@
+import hashlib
 import json
 import os
-from typing import Any, Dict
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+# Sidecar index: a dense array of little-endian uint64, one slot per input
+# ordinal, holding (byte offset + 1) of that record in the output file.
+# A zero slot means the ordinal has not been written yet.
+INDEX_ENTRY = struct.Struct("<Q")
+
+
+def query_hash(query: str) -> str:
+    return hashlib.blake2b(query.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def index_path_for(output_path: str) -> str:
+    return output_path + ".idx"
+
+
+# How many occupied slots completed_ordinals() checks against the output file
+INDEX_CHECK_SAMPLES = 64
+
+
+def completed_ordinals(
+    output_path: str, index_path: Optional[str] = None
+) -> Optional[Tuple[int, Set[int]]]:
+    """(n, extra): ordinals 0..n-1 and those in ``extra`` are already written.
+
+    Read from the ``.idx`` sidecar, so records written without an id (daemon
+    and service modes) never count. Returns None when the sidecar has no
+    entries, e.g. for output written before ids existed, or when it no longer
+    matches the output file (see _index_matches_output).
+    """
+    index_path = index_path or index_path_for(output_path)
+    if not os.path.exists(index_path):
+        return None
+    if not os.path.exists(output_path):
+        return None
+    output_size = os.path.getsize(output_path)
+    n_slots = os.path.getsize(index_path) // INDEX_ENTRY.size
+    step = max(1, n_slots // INDEX_CHECK_SAMPLES)
+    samples: Dict[int, int] = {}
+    prefix: Optional[int] = None
+    extra: Set[int] = set()
+    base = 0
+    with open(index_path, "rb") as f:
+        while True:
+            block = f.read(INDEX_ENTRY.size * 65536)
+            if len(block) < INDEX_ENTRY.size:
+                break
+            slots = array("Q")
+            slots.frombytes(block[: len(block) - len(block) % INDEX_ENTRY.size])
+            if sys.byteorder != "little":
+                slots.byteswap()
+            if max(slots) > output_size:
+                # Points past the end of the output: truncated or replaced since
+                return None
+            for i in range(-base % step, len(slots), step):
+                if slots[i]:
+                    samples[base + i] = slots[i] - 1
+            if slots[-1]:
+                samples[base + len(slots) - 1] = slots[-1] - 1
+            if prefix is None:
+                try:
+                    prefix = base + slots.index(0)
+                except ValueError:
+                    base += len(slots)
+                    continue
+            extra.update(base + i for i, slot in enumerate(slots) if slot and base + i > prefix)
+            base += len(slots)
+    if prefix is None:
+        prefix = base
+    if prefix == 0 and not extra:
+        return None
+    if not _index_matches_output(output_path, samples):
+        return None
+    return prefix, extra
+
+
+def _index_matches_output(output_path: str, samples: Dict[int, int]) -> bool:
+    """True if each sampled ordinal's offset starts a record with that id.
+
+    A full check would mean reading the whole output, which is what the
+    index exists to avoid; an evenly spaced sample plus the last slot catches
+    an output that was deleted, truncated or rewritten under the index.
+    """
+    with open(output_path, "rb") as f:
+        for ordinal, offset in sorted(samples.items(), key=lambda item: item[1]):
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    return False
+            f.seek(offset)
+            try:
+                record = json.loads(f.readline())
+            except ValueError:
+                return False
+            if not isinstance(record, dict) or record.get("id") != ordinal:
+                return False
+    return True
 
 
 class ResultWriter:
-    def __init__(self, output_path: str):
+    def __init__(self, output_path: str, index_path: Optional[str] = None):
         self.output_path = output_path
+        self.index_path = index_path or index_path_for(output_path)
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        # A sidecar that no longer matches the output is started over, not extended
+        keep_index = os.path.exists(self.index_path) and (
+            completed_ordinals(self.output_path, self.index_path) is not None
+        )
+        # Handles stay open for the whole run instead of reopening per line
+        self._file = open(self.output_path, "ab")
+        mode = "r+b" if keep_index else "w+b"
+        self._index = open(self.index_path, mode)
 
     def append_template_result(self, result_obj: Dict[str, Any]) -> None:
-        line = json.dumps(result_obj, ensure_ascii=False)
-        with open(self.output_path, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-            f.flush()
+        line = (json.dumps(result_obj, ensure_ascii=False) + "\n").encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(line)
+        self._file.flush()
+        ordinal = result_obj.get("id")
+        if isinstance(ordinal, int) and ordinal >= 0:
+            self._index.seek(ordinal * INDEX_ENTRY.size)
+            self._index.write(INDEX_ENTRY.pack(offset + 1))
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+        self._index.close()
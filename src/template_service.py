@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.batch_processor import BatchProcessor
+from src.ignore_classifier import IGNORE_SOURCE_CLASSIFIER, IGNORE_SOURCE_FALLBACK
+from utils.logger import Logger
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+class TemplateService:
+    """Local HTTP service that coalesces single-query requests into LLM batches.
+
+    Cache hits and confident local ignores are answered immediately; everything
+    else waits at most ``max_wait`` seconds for a batch of up to ``max_batch``
+    queries, which goes through ``BatchProcessor.process_queries``.
+    """
+
+    def __init__(
+        self,
+        processor: BatchProcessor,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        max_wait: float = 0.05,
+        max_batch: Optional[int] = None,
+        cache_size: int = 100000,
+        slo_ms: float = 2000.0,
+    ):
+        self.processor = processor
+        self.host = host
+        self.port = port
+        self.max_wait = max_wait
+        self.max_batch = max_batch or processor.batch_size
+        self.cache_size = cache_size
+        self.slo_ms = slo_ms
+        self.logger = Logger()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # The loop only keeps weak references to tasks; in-flight batches live here
+        self._tasks: set = set()
+        self._slots = asyncio.Semaphore(processor.concurrency)
+        self._inflight_batches = 0
+        self._latencies: Dict[str, deque] = {
+            source: deque(maxlen=10000) for source in ("cache", "local", "llm")
+        }
+        self._served = {"cache": 0, "local": 0, "llm": 0}
+        self._batches = 0
+        self._batched_queries = 0
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def warm_cache(self, output_path: str) -> int:
+        """Seed the cache from an existing output JSONL file; returns the cache size."""
+        if not os.path.exists(output_path):
+            return len(self._cache)
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except Exception:
+                    continue
+                if isinstance(record, dict) and isinstance(record.get("query"), str):
+                    self._remember(record["query"], record)
+        return len(self._cache)
+
+    def _remember(self, query: str, record: Dict[str, Any]) -> None:
+        # A failed batch is not an answer; let the next request retry it
+        if self.cache_size <= 0 or record.get("ignore_source") == IGNORE_SOURCE_FALLBACK:
+            return
+        # Batch records carry their input ordinal and hash; neither applies to a new caller
+        record = {k: v for k, v in record.items() if k not in ("id", "hash")}
+        self._cache[query] = record
+        self._cache.move_to_end(query)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _to_record(query: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        if result.get("ignore") is True:
+            record = {"query": query, "ignore": True}
+            if "ignore_source" in result:
+                record["ignore_source"] = result["ignore_source"]
+            return record
+        return {"query": query, "template": result.get("template", "")}
+
+    # ------------------------------------------------------------------
+    # Coalescing
+    # ------------------------------------------------------------------
+
+    async def templatize(self, query: str) -> Dict[str, Any]:
+        start = time.monotonic()
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            source, record = "cache", cached
+        elif self.processor.is_confident_ignore(query):
+            source, record = "local", {
+                "query": query,
+                "ignore": True,
+                "ignore_source": IGNORE_SOURCE_CLASSIFIER,
+            }
+        else:
+            source = "llm"
+            future = self._pending.get(query)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._pending[query] = future
+                if len(self._pending) >= self.max_batch:
+                    self._flush()
+                elif self._flush_task is None:
+                    self._flush_task = asyncio.create_task(self._flush_later())
+            record = await asyncio.shield(future)
+        self._served[source] += 1
+        self._latencies[source].append((time.monotonic() - start) * 1000.0)
+        return dict(record, source=source)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_wait)
+        self._flush_task = None
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: Dict[str, asyncio.Future]) -> None:
+        queries = list(batch)
+        async with self._slots:
+            self._inflight_batches += 1
+            try:
+                results = await self.processor.process_queries(queries)
+            except Exception as exc:
+                self.logger.error(f"Service batch of {len(queries)} queries failed: {exc}")
+                for future in batch.values():
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            finally:
+                self._inflight_batches -= 1
+        self._batches += 1
+        self._batched_queries += len(queries)
+        for query, result in zip(queries, results):
+            record = self._to_record(query, result)
+            self._remember(query, record)
+            if not batch[query].done():
+                batch[query].set_result(record)
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        latency: Dict[str, Any] = {}
+        within_slo = 0
+        total = 0
+        for source, samples in self._latencies.items():
+            values = list(samples)
+            total += len(values)
+            within_slo += sum(1 for v in values if v <= self.slo_ms)
+            latency[source] = {
+                "p50_ms": _percentile(values, 50),
+                "p95_ms": _percentile(values, 95),
+                "p99_ms": _percentile(values, 99),
+            }
+        return {
+            "served": dict(self._served),
+            "latency": latency,
+            "slo_ms": self.slo_ms,
+            "slo_attainment": within_slo / total if total else None,
+            "batches": self._batches,
+            "avg_batch_size": self._batched_queries / self._batches if self._batches else None,
+            "pending_queries": len(self._pending),
+            "inflight_batches": self._inflight_batches,
+            "cache_entries": len(self._cache),
+            "transport": self.processor.client.get_transport_stats(),
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path != "/templatize":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            data = json.loads(body or b"{}")
+        except Exception:
+            return 400, {"error": "body must be JSON"}
+        if isinstance(data, dict) and isinstance(data.get("query"), str):
+            return 200, await self.templatize(data["query"])
+        queries = data.get("queries") if isinstance(data, dict) else None
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            return 400, {"error": "expected {\"query\": str} or {\"queries\": [str, ...]}"}
+        results = await asyncio.gather(*(self.templatize(q) for q in queries))
+        return 200, {"results": list(results)}
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool
+    ) -> None:
+        out = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(out)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + out
+        )
+        await writer.drain()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) < 2:
+                    break
+                method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    # Body framing is unknown, so the connection cannot be reused
+                    await self._respond(writer, 400, {"error": "invalid Content-Length"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as exc:
+                    status, payload = 500, {"error": str(exc)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        await self.processor.warm_up()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.logger.info(
+            f"Template service listening on http://{self.host}:{self.port} "
+            f"(max_wait={self.max_wait}s, max_batch={self.max_batch})"
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.processor.flush()
@@ -0,0 +1,297 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.entity_value_registry import EntityValueRegistry
+
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Z_]+)\}")
+EXPORT_FORMATS = ("templates", "spacy", "conll")
+
+
+def _normalize(template: str) -> str:
+    return " ".join(template.lower().split())
+
+
+def template_id(template: str) -> int:
+    digest = hashlib.blake2b(_normalize(template).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class TemplateStore:
+    """Append-only, deduplicated template store.
+
+    ``templates.jsonl`` holds one line per distinct template (id, text, labels);
+    ``counts.json`` holds how often each template was produced. Only the
+    id -> count index is kept in memory, never the template text.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.templates_path = os.path.join(store_dir, "templates.jsonl")
+        self.counts_path = os.path.join(store_dir, "counts.json")
+        os.makedirs(store_dir, exist_ok=True)
+        self._counts: Dict[int, int] = {}
+        self._load_index()
+        self._file = open(self.templates_path, "a", encoding="utf-8")
+        self._dirty = False
+
+    def _load_index(self) -> None:
+        saved: Dict[str, int] = {}
+        if os.path.exists(self.counts_path):
+            try:
+                with open(self.counts_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except Exception:
+                saved = {}
+        for record in self.iter_templates():
+            key = record["id"]
+            # Templates appended after the last counts flush still count once
+            self._counts[int(key, 16)] = saved.get(key, 1)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, template: str) -> bool:
+        """Record one occurrence of ``template``; returns True if it was new."""
+        template = template.strip()
+        if not template:
+            return False
+        key = template_id(template)
+        self._dirty = True
+        if key in self._counts:
+            self._counts[key] += 1
+            return False
+        self._counts[key] = 1
+        record = {
+            "id": f"{key:016x}",
+            "template": template,
+            "labels": sorted(set(PLACEHOLDER_RE.findall(template))),
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return True
+
+    def count(self, template: str) -> int:
+        return self._counts.get(template_id(template), 0)
+
+    def flush(self, counts: bool = True) -> None:
+        """Flush new templates; with ``counts=False`` the (larger) counts file is left for later."""
+        self._file.flush()
+        if not counts or not self._dirty:
+            return
+        tmp = self.counts_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({f"{k:016x}": v for k, v in self._counts.items()}, f)
+        os.replace(tmp, self.counts_path)
+        self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def iter_templates(self) -> Iterator[Dict[str, Any]]:
+        """Stream stored templates with their current counts."""
+        if not os.path.exists(self.templates_path):
+            return
+        with open(self.templates_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except Exception:
+                    continue
+                record["count"] = self._counts.get(int(record["id"], 16), 1)
+                yield record
+
+    def import_legacy(self, path: str) -> int:
+        """Load an only_template_output.txt file (JSON strings with trailing commas)."""
+        added = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip().rstrip(",")
+                if not line:
+                    continue
+                try:
+                    template = json.loads(line)
+                except Exception:
+                    continue
+                if isinstance(template, str) and self.add(template):
+                    added += 1
+        self.flush()
+        return added
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def fill_slots(
+        template: str, reference_values: Dict[str, List[str]], rng: random.Random
+    ) -> Optional[Tuple[str, List[Tuple[int, int, str]]]]:
+        """Replace each {LABEL} with a registry value; returns (text, [(start, end, label)])."""
+        parts: List[str] = []
+        spans: List[Tuple[int, int, str]] = []
+        pos = 0
+        length = 0
+        for match in PLACEHOLDER_RE.finditer(template):
+            values = reference_values.get(match.group(1))
+            if not values:
+                return None
+            literal = template[pos:match.start()]
+            value = rng.choice(values)
+            parts.append(literal)
+            length += len(literal)
+            spans.append((length, length + len(value), match.group(1)))
+            parts.append(value)
+            length += len(value)
+            pos = match.end()
+        parts.append(template[pos:])
+        return "".join(parts), spans
+
+    @staticmethod
+    def _to_conll(text: str, spans: List[Tuple[int, int, str]]) -> str:
+        # Whitespace tokens are also cut at span edges, so "Pune." becomes
+        # "Pune" (entity) + "." (O) instead of one token tagged O.
+        edges = sorted({edge for start, end, _ in spans for edge in (start, end)})
+        lines = []
+        for match in re.finditer(r"\S+", text):
+            cuts = [match.start()]
+            cuts.extend(e for e in edges if match.start() < e < match.end())
+            cuts.append(match.end())
+            for a, b in zip(cuts, cuts[1:]):
+                tag = "O"
+                for start, end, label in spans:
+                    if a >= start and b <= end:
+                        tag = ("B-" if a == start else "I-") + label
+                        break
+                lines.append(f"{text[a:b]}\t{tag}")
+        return "\n".join(lines) + "\n\n"
+
+    def _format_records(
+        self,
+        record: Dict[str, Any],
+        fmt: str,
+        reference_values: Optional[Dict[str, List[str]]],
+        samples_per_template: int,
+        rng: random.Random,
+    ) -> Iterator[str]:
+        if fmt == "templates" and reference_values is None:
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+            return
+        for _ in range(samples_per_template):
+            filled = self.fill_slots(record["template"], reference_values, rng)
+            if filled is None:
+                return
+            text, spans = filled
+            if fmt == "conll":
+                yield self._to_conll(text, spans)
+            elif fmt == "spacy":
+                yield json.dumps(
+                    {"text": text, "entities": [list(s) for s in spans]}, ensure_ascii=False
+                ) + "\n"
+            else:
+                yield json.dumps(dict(record, text=text), ensure_ascii=False) + "\n"
+
+    def export(
+        self,
+        output_dir: str,
+        fmt: str = "templates",
+        val_ratio: float = 0.1,
+        seed: int = 13,
+        registry_path: Optional[str] = None,
+        samples_per_template: int = 1,
+        shuffle_buffer: int = 100000,
+    ) -> Dict[str, int]:
+        """Stream a shuffled train/val export.
+
+        Shuffling scatters records into random on-disk buckets of roughly
+        ``shuffle_buffer`` templates, then shuffles each bucket in memory.
+        The split is keyed on the template id so it is stable across exports.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {EXPORT_FORMATS}")
+        reference_values = None
+        if registry_path:
+            reference_values = EntityValueRegistry(registry_path, read_only=True).get_reference_values()
+        elif fmt != "templates":
+            raise ValueError(f"{fmt} export needs registry_path to fill slots")
+
+        self.flush()
+        os.makedirs(output_dir, exist_ok=True)
+        rng = random.Random(seed)
+        ext = "conll" if fmt == "conll" else "jsonl"
+        n_buckets = max(1, -(-len(self) // shuffle_buffer))
+        counts = {"train": 0, "val": 0}
+
+        for split in ("train", "val"):
+            bucket_paths = [
+                os.path.join(output_dir, f".{split}-bucket-{i}.tmp") for i in range(n_buckets)
+            ]
+            buckets = [open(p, "w", encoding="utf-8") for p in bucket_paths]
+            try:
+                for record in self.iter_templates():
+                    in_val = (int(record["id"], 16) % 10000) < val_ratio * 10000
+                    if in_val != (split == "val"):
+                        continue
+                    rng.choice(buckets).write(json.dumps(record, ensure_ascii=False) + "\n")
+            finally:
+                for b in buckets:
+                    b.close()
+
+            with open(os.path.join(output_dir, f"{split}.{ext}"), "w", encoding="utf-8") as out:
+                for path in bucket_paths:
+                    with open(path, "r", encoding="utf-8") as f:
+                        records = [json.loads(line) for line in f]
+                    os.remove(path)
+                    rng.shuffle(records)
+                    for record in records:
+                        for line in self._format_records(
+                            record, fmt, reference_values, samples_per_template, rng
+                        ):
+                            out.write(line)
+                            counts[split] += 1
+        return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Template store maintenance and training export")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import a legacy only_template_output.txt file")
+    imp.add_argument("--store", required=True, help="Template store directory")
+    imp.add_argument("--from", dest="source", required=True, help="Legacy template-only file")
+
+    exp = sub.add_parser("export", help="Export shuffled train/val files")
+    exp.add_argument("--store", required=True, help="Template store directory")
+    exp.add_argument("--output-dir", required=True)
+    exp.add_argument("--format", choices=EXPORT_FORMATS, default="templates")
+    exp.add_argument("--val-ratio", type=float, default=0.1)
+    exp.add_argument("--seed", type=int, default=13)
+    exp.add_argument("--registry", default=None, help="Fill {LABEL} slots from this registry file")
+    exp.add_argument("--samples-per-template", type=int, default=1)
+    exp.add_argument("--shuffle-buffer", type=int, default=100000, help="Templates held in memory while shuffling")
+    args = parser.parse_args()
+
+    store = TemplateStore(args.store)
+    if args.command == "import":
+        added = store.import_legacy(args.source)
+        print(f"✅ Imported {added} new templates ({len(store)} distinct in store)")
+    else:
+        counts = store.export(
+            args.output_dir,
+            fmt=args.format,
+            val_ratio=args.val_ratio,
+            seed=args.seed,
+            registry_path=args.registry,
+            samples_per_template=args.samples_per_template,
+            shuffle_buffer=args.shuffle_buffer,
+        )
+        print(f"✅ Exported {counts['train']} train / {counts['val']} val records to {args.output_dir}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Callable, List, Optional, Union
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+class FakeAzure:
+    """Stands in for AzureOpenAIClient.chat_completion.
+
+    Records every batch it is sent and how many calls overlap. Queries that
+    mention "weather" are ignored; everything else gets a clean template.
+    ``delay`` is seconds per call, or a function of the batch's queries.
+    """
+
+    def __init__(self, delay: Union[float, Callable[[List[str]], float]] = 0.0):
+        self.delay = delay
+        self.batches: List[List[str]] = []
+        self.active = 0
+        self.peak = 0
+
+    async def chat_completion(
+        self,
+        system_prompt: str,
+        user_payload: str,
+        validator: Optional[Any] = None,
+        kind: str = "batch",
+    ) -> str:
+        queries = json.loads(user_payload)["queries"]
+        self.batches.append(queries)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay(queries) if callable(self.delay) else self.delay)
+        finally:
+            self.active -= 1
+        content = json.dumps(
+            [
+                {"ignore": True} if "weather" in q
+                else {"ignore": False, "template": "{SOURCE_NAME}", "new_entity_values": {}}
+                for q in queries
+            ]
+        )
+        if validator is not None:
+            validator(content)
+        return content
+
+
+@pytest.fixture
+def azure_env(monkeypatch):
+    """Environment AzureOpenAIClient needs; nothing is ever sent to the endpoint."""
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1:9")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "test")
+    monkeypatch.setenv("AZURE_CHAT_DEPLOYMENT", "test")
+
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch, azure_env):
+    """Build a BatchProcessor in tmp_path whose LLM calls go to a FakeAzure (``proc.fake``)."""
+    from src.batch_processor import BatchProcessor
+
+    def make(
+        queries: Optional[List[str]] = None,
+        fake: Optional[FakeAzure] = None,
+        **kwargs: Any,
+    ) -> BatchProcessor:
+        input_path = tmp_path / "in.jsonl"
+        input_path.write_text("".join(json.dumps(q) + "\n" for q in queries or []))
+        options = dict(batch_size=10, concurrency=4)
+        options.update(kwargs)
+        proc = BatchProcessor(
+            input_path=str(input_path),
+            output_path=str(tmp_path / "out" / "templates_output.jsonl"),
+            registry_path=str(tmp_path / "registry.json"),
+            system_prompt="test",
+            **options,
+        )
+        proc.fake = fake or FakeAzure()
+        monkeypatch.setattr(proc.client, "chat_completion", proc.fake.chat_completion)
+        return proc
+
+    return make
+
+
+@pytest.fixture
+def processor(make_processor):
+    return make_processor()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+
+from conftest import FakeAzure
+from src.batch_processor import resume_point
+
+
+def _out_of_order_delay(queries):
+    # Later batches finish first, so writes land out of input order
+    return 0.02 / (1 + int(queries[0].split()[-1]) % 3)
+
+
+def test_run_keeps_concurrency_batches_in_flight(make_processor):
+    queries = [f"bus from pune {i}" for i in range(40)]
+    proc = make_processor(queries, fake=FakeAzure(_out_of_order_delay), batch_size=2)
+    asyncio.run(proc.run())
+    proc.writer.close()
+
+    assert proc.fake.peak == 4
+    with open(proc.output_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["id"] for r in records) == list(range(40))
+    assert all(queries[r["id"]] == r["query"] for r in records)
+    assert resume_point(proc.output_path) == (40, set())
+
+
+def test_resume_skips_ordinals_written_out_of_order(make_processor):
+    queries = [f"bus from pune {i}" for i in range(6)]
+    proc = make_processor(queries, batch_size=2, concurrency=1)
+    for ordinal in (0, 1, 4):
+        proc.writer.append_template_result({"id": ordinal, "query": queries[ordinal], "ignore": True})
+    # Records without an id (daemon/service output) never count toward resume
+    proc.writer.append_template_result({"query": "from the daemon", "ignore": True})
+    proc.writer.flush()
+    assert resume_point(proc.output_path) == (2, {4})
+
+    asyncio.run(proc.run())
+    proc.writer.close()
+    with open(proc.output_path, encoding="utf-8") as f:
+        ids = [json.loads(line).get("id") for line in f]
+    assert sorted(i for i in ids if i is not None) == list(range(6))
+
+
+def test_stale_index_is_ignored_and_restarted(make_processor):
+    queries = [f"bus from pune {i}" for i in range(4)]
+    proc = make_processor(queries, batch_size=2, concurrency=1)
+    asyncio.run(proc.run())
+    proc.writer.close()
+    assert resume_point(proc.output_path) == (4, set())
+
+    # Output deleted, index left behind: nothing is done any more
+    os.remove(proc.output_path)
+    assert resume_point(proc.output_path) == (0, set())
+
+    rerun = make_processor(queries, batch_size=2, concurrency=1)
+    asyncio.run(rerun.run())
+    rerun.writer.close()
+    assert len(rerun.fake.batches) == 2
+    assert resume_point(proc.output_path) == (4, set())
+
+    # Output replaced by lines without matching ids: resume by line count
+    with open(proc.output_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"query": queries[0], "ignore": True}) + "\n")
+    assert resume_point(proc.output_path) == (1, set())
+
+
+def test_failed_batch_cancels_batches_in_flight(make_processor):
+    queries = [f"bus from pune {i}" for i in range(8)]
+    # The first batch answers at once; the rest would take far longer than the test
+    fake = FakeAzure(lambda batch: 0.0 if batch[0].endswith(" 0") else 30.0)
+    proc = make_processor(queries, fake=fake, batch_size=2)
+    handle_results = proc._handle_results
+
+    async def failing_handle_results(batch, results, ordinals=None):
+        if ordinals and ordinals[0] == 0:
+            raise RuntimeError("disk full")
+        await handle_results(batch, results, ordinals)
+
+    proc._handle_results = failing_handle_results
+
+    async def go():
+        try:
+            await asyncio.wait_for(proc.run(), timeout=5)
+        except RuntimeError as exc:
+            # Checked before asyncio.run() tears down whatever is left
+            return exc, fake.active
+
+    error, still_active = asyncio.run(go())
+    assert str(error) == "disk full"
+    assert len(fake.batches) == 4
+    assert still_active == 0
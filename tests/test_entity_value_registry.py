@@ -0,0 +1,78 @@
+import json
+
+from src.entity_value_registry import ENTITY_VALUES, EntityValueRegistry
+
+
+def _registry(tmp_path, **kwargs) -> EntityValueRegistry:
+    return EntityValueRegistry(str(tmp_path / "registry.json"), **kwargs)
+
+
+def _added(registry: EntityValueRegistry, label: str):
+    seeds = {v.lower() for v in ENTITY_VALUES[label]}
+    return [v for v in registry.get_reference_values()[label] if v.lower() not in seeds]
+
+
+def test_seeds_are_never_evicted(tmp_path):
+    registry = _registry(tmp_path, max_values_per_label=1)
+    registry.update_with_new_values({"OPERATOR": ["Alpha Travels", "Beta Travels"]})
+    active = registry.get_reference_values()["OPERATOR"]
+    assert all(seed in active for seed in ENTITY_VALUES["OPERATOR"])
+    assert _added(registry, "OPERATOR") == ["Beta Travels"]
+
+
+def test_eviction_takes_fewest_hits_then_oldest(tmp_path):
+    registry = _registry(tmp_path, max_values_per_label=2)
+    registry.update_with_new_values({"OPERATOR": ["Alpha", "Beta"]})
+    registry.update_with_new_values({"OPERATOR": ["Alpha"]})
+    # Alpha has 2 hits; Beta and Gamma 1 each, so the older Beta goes
+    registry.update_with_new_values({"OPERATOR": ["Gamma"]})
+    assert _added(registry, "OPERATOR") == ["Alpha", "Gamma"]
+    assert "Beta" in registry.get_leak_check_values()["OPERATOR"]
+    assert "Beta" not in registry.get_reference_values()["OPERATOR"]
+
+
+def test_archived_value_is_promoted_when_proposed_again(tmp_path):
+    registry = _registry(tmp_path, max_values_per_label=1)
+    registry.update_with_new_values({"OPERATOR": ["Alpha Travels"]})
+    registry.update_with_new_values({"OPERATOR": ["Beta"]})
+    assert _added(registry, "OPERATOR") == ["Beta"]
+
+    assert registry.update_with_new_values({"OPERATOR": ["alpha travels"]})
+    # Original spelling comes back; Beta (1 hit) now goes to the archive
+    assert _added(registry, "OPERATOR") == ["Alpha Travels"]
+    archive = json.loads((tmp_path / "registry_archive.json").read_text())
+    assert archive["archived"]["OPERATOR"] == ["Beta"]
+
+
+def test_archive_is_trimmed_only_when_capped_explicitly(tmp_path):
+    values = {"OPERATOR": [f"Op {i}" for i in range(5)]}
+
+    kept = _registry(tmp_path / "kept", max_values_per_label=1)
+    kept.update_with_new_values(values)
+    assert len(kept._archived["OPERATOR"]) == 4
+
+    trimmed = _registry(tmp_path / "trimmed", max_values_per_label=1, max_archived_per_label=2)
+    trimmed.update_with_new_values(values)
+    # Evicted oldest first, so the two most recently archived survive
+    assert list(trimmed._archived["OPERATOR"].values()) == ["Op 2", "Op 3"]
+
+
+def test_uncapped_run_merges_archive_back(tmp_path):
+    capped = _registry(tmp_path, max_values_per_label=1)
+    capped.update_with_new_values({"OPERATOR": ["Alpha", "Beta"]})
+    assert _added(capped, "OPERATOR") == ["Beta"]
+
+    uncapped = _registry(tmp_path)
+    assert _added(uncapped, "OPERATOR") == ["Beta", "Alpha"]
+
+
+def test_read_only_registry_never_writes(tmp_path):
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps({"OPERATOR": ["Alpha", "Beta", "Gamma"]}))
+    registry = _registry(tmp_path, max_values_per_label=1, read_only=True)
+    registry.update_with_new_values({"OPERATOR": ["Delta"]})
+    registry.flush()
+
+    assert _added(registry, "OPERATOR") == ["Delta"]
+    assert json.loads(path.read_text()) == {"OPERATOR": ["Alpha", "Beta", "Gamma"]}
+    assert not (tmp_path / "registry_archive.json").exists()
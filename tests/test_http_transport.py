@@ -0,0 +1,57 @@
+import asyncio
+
+from src.http_transport import UNTRACED, build_http_client
+
+
+async def _server(respond: bool):
+    async def handle(reader, writer):
+        # Answer every request on a kept-alive connection until the client drops it
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                if not respond:
+                    await reader.read()
+                    break
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+
+
+def test_untraced_requests_stay_out_of_the_stats():
+    async def go():
+        server, url = await _server(respond=True)
+        client, stats, _ = build_http_client(concurrency=2)
+        async with server, client:
+            await client.head(url, extensions={UNTRACED: True})
+            untraced = stats.snapshot()
+            await client.head(url)
+            return untraced, stats.snapshot()
+
+    untraced, traced = asyncio.run(go())
+    assert untraced["requests"] == 0 and untraced["peak_inflight"] == 0
+    assert traced["requests"] == 1 and traced["inflight"] == 0
+
+
+def test_cancelled_requests_are_not_left_in_flight():
+    async def go():
+        server, url = await _server(respond=False)
+        # One pooled connection: the second request is cancelled while still waiting for it
+        client, stats, _ = build_http_client(concurrency=0)
+        async with server, client:
+            requests = [asyncio.ensure_future(client.get(url)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            peak = stats.inflight
+            for request in reversed(requests):
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+            return peak, stats.snapshot()
+
+    peak, snapshot = asyncio.run(go())
+    assert peak == 2
+    assert snapshot["inflight"] == 0
+    assert snapshot["requests"] == 2
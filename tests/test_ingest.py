@@ -0,0 +1,43 @@
+import json
+
+from src.ingest import IngestPipeline, _dedup_shard
+
+
+def _write_lines(path, queries):
+    path.write_text("".join(json.dumps(q) + "\n" for q in queries))
+
+
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spilled_dedup_matches_in_memory_dedup(tmp_path):
+    queries = [f"bus from pune {i % 37}" for i in range(200)]
+    _write_lines(tmp_path / "a.jsonl", queries)
+    _write_lines(tmp_path / "b.jsonl", queries)
+
+    whole = _dedup_shard(str(tmp_path / "a.jsonl"), str(tmp_path / "a.out"))
+    spilled = _dedup_shard(str(tmp_path / "b.jsonl"), str(tmp_path / "b.out"), 1, 5)
+
+    assert whole == spilled == {"written": 37, "dropped_duplicate": 163}
+    assert sorted(_read_lines(tmp_path / "b.out")) == sorted(_read_lines(tmp_path / "a.out"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.out", "b.out"]
+
+
+def test_pipeline_spills_shards_over_the_row_budget(tmp_path):
+    queries = [f"bus from pune to goa {i % 50}" for i in range(300)]
+    _write_lines(tmp_path / "dump.jsonl", queries)
+    pipeline = IngestPipeline(
+        str(tmp_path / "dump.jsonl"),
+        str(tmp_path / "out"),
+        num_shards=2,
+        workers=1,
+        chunk_size=40,
+        max_dedup_rows=20,
+    )
+    stats = pipeline.run()
+
+    written = [q for path in stats["shards"] for q in _read_lines(path)]
+    assert sorted(written) == sorted(set(queries))
+    assert stats["counts"]["dropped_duplicate"] == 250
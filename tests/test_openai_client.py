@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, List
+
+from src.openai_client import AzureOpenAIClient
+
+
+class FakeCompletions:
+    """Replaces ``client.chat.completions``; each deployment answers after its own delay."""
+
+    def __init__(self, delays: Dict[str, float]):
+        self.delays = delays
+        self.started: List[str] = []
+        self.cancelled: List[str] = []
+
+    async def create(self, model: str, **kwargs):
+        self.started.append(model)
+        try:
+            await asyncio.sleep(self.delays[model])
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        message = SimpleNamespace(content=f'"{model}"')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _client(delays: Dict[str, float], **kwargs) -> AzureOpenAIClient:
+    options = dict(hedge_percentile=50, hedge_budget=1.0, hedge_min_samples=2)
+    options.update(kwargs)
+    client = AzureOpenAIClient(hedge_deployment="hedge", **options)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(delays)))
+    client._latencies["batch"].extend([0.01] * 20)
+    return client
+
+
+def test_hedge_wins_and_slow_primary_is_cancelled(azure_env):
+    client = _client({"test": 5.0, "hedge": 0.01})
+
+    async def go():
+        result = await asyncio.wait_for(client.chat_completion("s", "u"), timeout=2)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(go()) == '"hedge"'
+    completions = client.client.chat.completions
+    assert completions.started == ["test", "hedge"]
+    assert completions.cancelled == ["test"]
+    stats = client.get_hedge_stats()
+    assert stats["hedges_launched"] == 1
+    assert stats["hedge_wins"] == 1 and stats["primary_wins_after_hedge"] == 0
+
+
+def test_primary_win_cancels_hedge(azure_env):
+    client = _client({"test": 0.05, "hedge": 5.0})
+
+    async def go():
+        result = await asyncio.wait_for(client.chat_completion("s", "u"), timeout=2)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(go()) == '"test"'
+    assert client.client.chat.completions.cancelled == ["hedge"]
+    stats = client.get_hedge_stats()
+    assert stats["hedge_wins"] == 0 and stats["primary_wins_after_hedge"] == 1
+
+
+def test_budget_limits_hedges_per_kind(azure_env):
+    client = _client({"test": 0.03, "hedge": 5.0}, hedge_budget=0.25)
+
+    async def go():
+        for _ in range(4):
+            await client.chat_completion("s", "u")
+        # Corrections have no latency samples of their own yet, so they never hedge
+        await client.chat_completion("s", "u", kind="correction")
+
+    asyncio.run(go())
+    stats = client.get_hedge_stats()
+    # 0.25 of 4 batch calls allows a single hedge; calls 1-3 are over budget
+    assert stats["hedges_launched"] == 1
+    assert stats["hedges_skipped_budget"] == 3
+    assert stats["by_kind"]["batch"]["calls"] == 4
+    assert stats["by_kind"]["correction"] == {
+        "calls": 1, "hedges_launched": 0, "hedge_delay_s": None
+    }
+    assert len(client._latencies["correction"]) == 1
+
+
+def test_caller_cancellation_cancels_primary(azure_env):
+    client = _client({"test": 5.0, "hedge": 5.0})
+
+    async def go():
+        call = asyncio.ensure_future(client.chat_completion("s", "u"))
+        await asyncio.sleep(0.001)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(go())
+    completions = client.client.chat.completions
+    assert completions.started == ["test"]
+    assert completions.cancelled == ["test"]
@@ -0,0 +1,46 @@
+import json
+
+from src.output_index import OutputIndex, rebuild_index
+from src.result_writer import ResultWriter, index_path_for
+
+
+def _write_out_of_order(path):
+    writer = ResultWriter(str(path))
+    for ordinal in (2, 0, 3):
+        writer.append_template_result({"id": ordinal, "query": f"q{ordinal}", "ignore": True})
+    writer.append_template_result({"query": "no id", "ignore": True})
+    writer.close()
+
+
+def test_get_and_iter_ordered_follow_input_order(tmp_path):
+    output = tmp_path / "out" / "templates_output.jsonl"
+    _write_out_of_order(output)
+    index = OutputIndex(str(output))
+    try:
+        assert len(index) == 4
+        assert index.get(3)["query"] == "q3"
+        assert index.get(1) is None
+        assert index.get(4) is None and index.get(-1) is None
+        assert [r["query"] for r in index.iter_ordered()] == ["q0", "q2", "q3"]
+    finally:
+        index.close()
+
+
+def test_rebuild_index_matches_the_written_one(tmp_path):
+    output = tmp_path / "out" / "templates_output.jsonl"
+    _write_out_of_order(output)
+    idx_path = index_path_for(str(output))
+    with open(idx_path, "rb") as f:
+        written = f.read()
+
+    with open(idx_path, "wb"):
+        pass
+    assert rebuild_index(str(output)) == 3
+    with open(idx_path, "rb") as f:
+        assert f.read() == written
+
+    index = OutputIndex(str(output))
+    try:
+        assert json.dumps(index.get(0)) == json.dumps({"id": 0, "query": "q0", "ignore": True})
+    finally:
+        index.close()
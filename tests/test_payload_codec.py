@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from src.entity_value_registry import ENTITY_LABELS
+from src.payload_codec import (
+    check_round_trip,
+    codes_for,
+    decode_payload,
+    decode_results,
+    encode_payload,
+    label_codes,
+)
+
+
+REFERENCE = {
+    "SOURCE_NAME": ["Bangalore", "BLR", "bangalore", " Navi  Mumbai "],
+    "ARRIVAL_TIME": ["by morning"],
+    "AC_TYPE": ["AC", "Non AC"],
+}
+
+
+def test_label_codes_number_collisions():
+    codes = label_codes(ENTITY_LABELS)
+    assert codes["SOURCE_NAME"] == "SN"
+    assert codes["ARRIVAL_TIME"] == "AT"
+    assert codes["AC_TYPE"] == "AT2"
+    assert len(set(codes.values())) == len(ENTITY_LABELS)
+    assert not set(codes.values()) & set(ENTITY_LABELS)
+
+
+def test_decode_results_expands_echoed_codes():
+    codes = codes_for(ENTITY_LABELS, REFERENCE)
+    results = [
+        {
+            "ignore": False,
+            "template": "{AT2} bus from {SN} {UNKNOWN}",
+            "new_entity_values": {"AT": ["noon"]},
+        },
+        {"ignore": True},
+        "not a dict",
+    ]
+    decoded = decode_results(results, codes)
+    assert decoded[0]["template"] == "{AC_TYPE} bus from {SOURCE_NAME} {UNKNOWN}"
+    assert decoded[0]["new_entity_values"] == {"ARRIVAL_TIME": ["noon"]}
+    assert decoded[1:] == [{"ignore": True}, "not a dict"]
+
+
+def test_compact_round_trip_keeps_every_value():
+    assert check_round_trip(ENTITY_LABELS, REFERENCE) == []
+    queries, labels, reference = decode_payload(
+        encode_payload(["bus"], ENTITY_LABELS, REFERENCE, "compact")
+    )
+    assert queries == ["bus"] and set(labels) == set(ENTITY_LABELS)
+    assert reference["SOURCE_NAME"] == ["bangalore", "blr", "navi mumbai"]
+
+
+def test_json_format_matches_the_original_payloads(processor):
+    labels = processor.registry.get_entity_labels()
+    reference = processor.registry.get_reference_values()
+
+    before = json.dumps(
+        {"queries": ["bus from pune"], "entity_labels": labels, "entity_values_reference": reference},
+        ensure_ascii=False,
+    )
+    assert encode_payload(["bus from pune"], labels, reference) == before
+
+    leaked = [{"label": "SOURCE_NAME", "value": "Pune"}]
+    correction = processor._build_correction_payload(
+        "bus from Pune", "bus from Pune", leaked, reference
+    )
+    original = json.loads(correction)
+    before = json.dumps(
+        {
+            "queries": ["bus from Pune"],
+            "previous_template": "bus from Pune",
+            "errors": original["errors"],
+            "instruction": original["instruction"],
+            "entity_labels": labels,
+            "entity_values_reference": reference,
+        },
+        ensure_ascii=False,
+    )
+    assert correction == before
+
+    sent = []
+    chat_completion = processor.client.chat_completion
+
+    async def recording(system_prompt, user_payload, **kwargs):
+        sent.append(user_payload)
+        return await chat_completion(system_prompt, user_payload, **kwargs)
+
+    processor.client.chat_completion = recording
+    asyncio.run(processor.process_queries(["bus from pune"]))
+    assert sent[0] == encode_payload(["bus from pune"], labels, reference)
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+from src.output_index import OutputIndex
+from src.query_daemon import QueryDaemon
+
+
+def test_tailed_queries_are_written_with_their_line_number(make_processor, tmp_path):
+    tail = tmp_path / "incoming.jsonl"
+    tail.write_text(
+        json.dumps("bus from pune 0") + "\n\nnot json\n" + json.dumps("weather today") + "\n"
+    )
+    proc = make_processor(batch_size=2)
+    checkpoint = tmp_path / "daemon.checkpoint.json"
+
+    async def run_until(processed):
+        daemon = QueryDaemon(
+            proc, str(checkpoint), tail_path=str(tail), max_wait=0.01, poll_interval=0.01
+        )
+        task = asyncio.create_task(daemon.run())
+        while daemon._processed < processed:
+            await asyncio.sleep(0.01)
+        daemon.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run_until(2))
+    # A restart picks up the line count from the checkpoint
+    with open(tail, "a", encoding="utf-8") as f:
+        f.write(json.dumps("bus from goa") + "\n")
+    asyncio.run(run_until(1))
+    proc.writer.close()
+
+    assert json.loads(checkpoint.read_text())["line"] == 5
+    index = OutputIndex(proc.output_path)
+    try:
+        assert [(r["id"], r["query"]) for r in index.iter_ordered()] == [
+            (0, "bus from pune 0"), (3, "weather today"), (4, "bus from goa")
+        ]
+    finally:
+        index.close()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+from typing import Any, Optional, Tuple
+
+from src.template_service import TemplateService
+
+
+def test_flushes_when_max_batch_is_reached(processor):
+    service = TemplateService(processor, max_wait=30.0, max_batch=3)
+
+    async def go():
+        return await asyncio.wait_for(
+            asyncio.gather(*(service.templatize(f"bus from pune {i}") for i in range(3))),
+            timeout=5,
+        )
+
+    results = asyncio.run(go())
+    assert processor.fake.batches == [[f"bus from pune {i}" for i in range(3)]]
+    assert all(r["template"] == "{SOURCE_NAME}" and r["source"] == "llm" for r in results)
+
+
+def test_flushes_after_max_wait(processor):
+    service = TemplateService(processor, max_wait=0.05, max_batch=100)
+
+    async def go():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(
+            service.templatize("bus from pune"), service.templatize("weather today")
+        )
+        return results, loop.time() - start
+
+    (templated, ignored), elapsed = asyncio.run(go())
+    assert processor.fake.batches == [["bus from pune", "weather today"]]
+    assert elapsed >= 0.05
+    assert templated["template"] == "{SOURCE_NAME}"
+    assert ignored["ignore"] is True
+
+
+def test_duplicate_queries_share_one_future(processor):
+    processor.fake.delay = 0.05
+    service = TemplateService(processor, max_wait=0.01, max_batch=100)
+
+    async def go():
+        return await asyncio.gather(*(service.templatize("bus from pune") for _ in range(5)))
+
+    results = asyncio.run(go())
+    assert processor.fake.batches == [["bus from pune"]]
+    assert len({json.dumps(r, sort_keys=True) for r in results}) == 1
+
+
+def test_repeated_query_is_served_from_cache(processor):
+    service = TemplateService(processor, max_wait=0.01, max_batch=100)
+
+    async def go():
+        first = await service.templatize("bus from pune")
+        second = await service.templatize("bus from pune")
+        return first, second
+
+    first, second = asyncio.run(go())
+    assert first["source"] == "llm"
+    assert second["source"] == "cache"
+    assert second["template"] == first["template"]
+    assert len(processor.fake.batches) == 1
+
+
+async def _http(port: int, raw: bytes) -> Tuple[int, Any]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def _request(method: str, path: str, body: bytes = b"", length: Optional[str] = None) -> bytes:
+    length = str(len(body)) if length is None else length
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def test_metrics_and_bad_requests_over_http(processor):
+    service = TemplateService(processor, max_wait=0.01, max_batch=100)
+
+    async def go():
+        server = await asyncio.start_server(service._handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            body = json.dumps({"queries": ["bus from pune", "bus from pune", "weather"]}).encode()
+            templatized = await _http(port, _request("POST", "/templatize", body))
+            cached = await _http(
+                port, _request("POST", "/templatize", b'{"query": "bus from pune"}')
+            )
+            metrics = await _http(port, _request("GET", "/metrics"))
+            bad_length = await _http(port, _request("POST", "/templatize", b"{}", "abc"))
+        return templatized, cached, metrics, bad_length
+
+    templatized, cached, metrics, bad_length = asyncio.run(go())
+    assert templatized[0] == 200 and len(templatized[1]["results"]) == 3
+    assert cached[1]["source"] == "cache"
+
+    status, data = metrics
+    assert status == 200
+    assert data["served"] == {"cache": 1, "local": 0, "llm": 3}
+    assert data["batches"] == 1 and data["avg_batch_size"] == 2
+    assert data["pending_queries"] == 0 and data["inflight_batches"] == 0
+    assert data["latency"]["llm"]["p50_ms"] is not None
+    assert "transport" in data
+
+    assert bad_length == (400, {"error": "invalid Content-Length"})
+
+
+def test_warm_cache_drops_batch_ids(processor, tmp_path):
+    batch_output = tmp_path / "batch.jsonl"
+    batch_output.write_text(
+        json.dumps({"id": 7, "hash": "abc", "query": "bus from pune", "template": "{SOURCE_NAME}"})
+        + "\n"
+        + json.dumps({"query": "weather", "ignore": True, "ignore_source": "fallback"})
+        + "\n"
+    )
+    service = TemplateService(processor, max_wait=0.01, max_batch=100)
+    assert service.warm_cache(str(batch_output)) == 1
+    assert service.warm_cache(str(tmp_path / "missing.jsonl")) == 1
+
+    cached = asyncio.run(service.templatize("bus from pune"))
+    assert cached["source"] == "cache"
+    assert "id" not in cached and "hash" not in cached
+    assert processor.fake.batches == []
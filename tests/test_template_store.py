@@ -0,0 +1,44 @@
+import random
+
+from src.template_store import TemplateStore
+
+
+def _conll(template, reference_values):
+    text, spans = TemplateStore.fill_slots(template, reference_values, random.Random(0))
+    block = TemplateStore._to_conll(text, spans)
+    return [tuple(line.split("\t")) for line in block.strip().splitlines()]
+
+
+def test_conll_splits_trailing_punctuation_off_entities():
+    rows = _conll(
+        "bus from {SOURCE_NAME} to {DESTINATION_NAME}.",
+        {"SOURCE_NAME": ["Mumbai"], "DESTINATION_NAME": ["Pune"]},
+    )
+    assert rows == [
+        ("bus", "O"),
+        ("from", "O"),
+        ("Mumbai", "B-SOURCE_NAME"),
+        ("to", "O"),
+        ("Pune", "B-DESTINATION_NAME"),
+        (".", "O"),
+    ]
+
+
+def test_conll_multiword_entities_and_attached_punctuation():
+    rows = _conll(
+        "{SOURCE_NAME}, then {DESTINATION_NAME}?",
+        {"SOURCE_NAME": ["Mumbai"], "DESTINATION_NAME": ["New Delhi"]},
+    )
+    assert rows == [
+        ("Mumbai", "B-SOURCE_NAME"),
+        (",", "O"),
+        ("then", "O"),
+        ("New", "B-DESTINATION_NAME"),
+        ("Delhi", "I-DESTINATION_NAME"),
+        ("?", "O"),
+    ]
+
+
+def test_conll_keeps_punctuation_inside_a_value():
+    rows = _conll("need {AC_TYPE} seats", {"AC_TYPE": ["A/C"]})
+    assert rows == [("need", "O"), ("A/C", "B-AC_TYPE"), ("seats", "O")]